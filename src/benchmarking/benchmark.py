@@ -3,20 +3,50 @@ Benchmarking various parts of legis-match
 """
 
 import os
+import pickle
 import random
 import re
+import subprocess
 import sys
+import tempfile
 import time
+import tracemalloc
+from collections import Counter
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from statistics import mean
 from typing import List, Tuple
 
+import datasketch
 import numpy as np
 
-from src.encode import encode_normalized_text
-from src.processing.compare_fn import smith_waterman
+from src.encode import (MODEL_NAME, embed_long_sections, embed_sections, encode_batch,
+                        encode_normalized_text)
+from src.benchmarking.candidate_recall import (candidate_filters, candidate_recall_report,
+                                               evaluate_filters, exhaustive_ground_truth)
+from src.processing.alignment_cache import AlignmentCache
+from src.processing.compare_fn import (SW_ENGINES, WILKERSON_WEIGHTS, align, align_many,
+                                       compile_scoring, effective_gap, enhanced_match_score,
+                                       fill_row, row_scores_for, smith_waterman,
+                                       smith_waterman_linear, smith_waterman_numpy,
+                                       smith_waterman_score, smith_waterman_seeded,
+                                       smith_waterman_top_k)
+from src.processing.legis_index import (adaptive_candidate_indices, add_sections,
+                                        all_vs_all_candidates, banded_lsh_index, build_all_indexes,
+                                        build_header_index, build_minhash_signatures,
+                                        build_quote_index, build_tfidf_index,
+                                        create_minhash_index, find_candidate_indices,
+                                        find_candidate_indices_batch, find_candidate_sections,
+                                        header_candidate_indices, lsh_candidate_indices,
+                                        quote_candidate_indices, ranking_drift, remove_sections,
+                                        tfidf_candidate_indices)
+from src.processing.embedding_cache import EmbeddingCache
+from src.processing.embedding_index import IVFIndex, exact_search
+from src.processing.index_snapshot import load_snapshot, save_snapshot
 from src.processing.legis_parse import process_section
+from src.processing.quantized_embeddings import Int8Embeddings
+from src.processing.legis_schedule import schedule_alignments
 from src.processing.parse_fn import get_all_sections
+from src.processing.token_corpus import TokenCorpus
 from src.utils import get_core_bill_xml
 
 NUM_RUNS = 100
@@ -129,6 +159,21 @@ def load_string_pool() -> List[str]:
     return string_pool, [s.split() for s in string_pool]
 
 
+def load_sections() -> List[dict]:
+    """
+    Load all the xml files in the data dir and return the processed sections.
+    """
+    sections = []
+    for path in os.listdir("data/"):
+        bill_key = file_name_to_key(path)
+        core_xml = get_core_bill_xml(
+            bill_key["congress_number"], bill_key["bill_number"],
+            bill_key["bill_type"], bill_key["bill_version"])
+        sections.extend(process_section(section)
+                        for section in get_all_sections(core_xml).values())
+    return sections
+
+
 def benchmark_sw(func, string_pool: List[str], runs=NUM_RUNS) -> List[float]:
     """
     Given a function, a pool of strings, and a number of runs,
@@ -200,6 +245,260 @@ def smith_wat(s1: str, s2: str):
     assert "score" in result
 
 
+def numpy_smith_wat(s1: str, s2: str):
+    """
+    Wrapper for vectorized smith waterman engine
+    """
+    result = smith_waterman_numpy(s1, s2)
+    assert "score" in result
+
+
+def linear_smith_wat(s1: str, s2: str):
+    """
+    Wrapper for linear-memory smith waterman engine
+    """
+    result = smith_waterman_linear(s1, s2)
+    assert "score" in result
+
+
+def score_only_smith_wat(s1: str, s2: str):
+    """
+    Wrapper for score-only smith waterman pass, no traceback
+    """
+    result = smith_waterman_score(s1, s2)
+    assert "score" in result
+
+
+def benchmark_sw_memory(funcs, string_pool: List[List[str]], runs: int = 3):
+    """
+    Peak traced allocation per function, always comparing to the longest section.
+    """
+    longest = max(string_pool, key=len)
+    samples = [random.choice(string_pool) for _ in range(runs)]
+    for sample in samples:
+        for func in funcs:
+            tracemalloc.start()
+            func(sample, longest)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{func.__name__}: len1: {len(sample)}, len2: {len(longest)}, "
+                  f"peak: {peak / 2**20:.1f} MiB")
+
+
+def compare_sw_engines(string_pool: List[List[str]], runs: int = 10, engines=("python", "numpy"), force_longest: bool = False):
+    """
+    Run each alignment engine on the same sampled pairs, check that every engine
+    agrees with the first one, and report per-engine timings and speedup.
+    """
+    longest = max(string_pool, key=len)
+    if force_longest:
+        pairs = [(random.choice(string_pool), longest) for _ in range(runs)]
+    else:
+        pairs = [tuple(random.sample(string_pool, 2)) for _ in range(runs)]
+
+    timings = {engine: [] for engine in engines}
+    for i, (s1, s2) in enumerate(pairs, 1):
+        reference = None
+        for engine in engines:
+            start = time.perf_counter()
+            result = SW_ENGINES[engine](s1, s2)
+            duration = time.perf_counter() - start
+            timings[engine].append(duration)
+
+            if reference is None:
+                reference = result
+            elif result != reference:
+                print(f"Run {i}: {engine} disagrees with {engines[0]}")
+
+        summary = ", ".join(
+            f"{engine}: {timings[engine][-1]:.4f}s" for engine in engines)
+        print(f"Run {i}: len1: {len(s1)}, len2: {len(s2)}, {summary}")
+
+    baseline = sum(timings[engines[0]])
+    for engine in engines:
+        total = sum(timings[engine])
+        print(f"{engine}: avg {mean(timings[engine]):.4f}s, "
+              f"max {max(timings[engine]):.4f}s, speedup {baseline / total:.1f}x\n")
+    return timings
+
+
+def check_seeded_far_diagonal(string_pool: List[List[str]], block: int = 40, offset: int = 2000):
+    """
+    Seeded sw must find a copied block whose diagonal is far from the first
+    seed's: plant a short shared prefix near the start of both sequences, and a
+    longer copied block `offset` tokens further into the candidate.
+    """
+    target = random.choice([tokens for tokens in string_pool if len(tokens) >= block + 3] or [["seed"] * (block + 3)])
+    target = ["SEED_A", "SEED_B", "SEED_C"] + target[:block]
+    filler = [f"FILLER_{i}" for i in range(offset)]
+    candidate = target[:3] + filler + target[3:] + filler[:100]
+    exhaustive = smith_waterman_linear(target, candidate)["score"]
+    seeded = smith_waterman_seeded(target, candidate)["score"]
+    assert seeded == exhaustive, f"seeded sw missed a far-diagonal block: {seeded} vs {exhaustive}"
+    print(f"Far-diagonal block: seeded {seeded} == exhaustive {exhaustive}")
+
+
+def benchmark_seeded_sw(string_pool: List[List[str]], runs: int = 20, force_longest: bool = True):
+    """
+    Seed-and-extend vs exhaustive (linear-memory) sw on the same pairs.
+    Reports speedup and how often the seeded score matches the exhaustive one.
+    """
+    check_seeded_far_diagonal(string_pool)
+    longest = max(string_pool, key=len)
+    exhaustive_acc, seeded_acc, ratios = [], [], []
+    agree = 0
+    for i in range(runs):
+        if force_longest:
+            s1, s2 = random.choice(string_pool), longest
+        else:
+            s1, s2 = random.sample(string_pool, 2)
+
+        start = time.perf_counter()
+        exhaustive = smith_waterman_linear(s1, s2)
+        exhaustive_acc.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        seeded = smith_waterman_seeded(s1, s2)
+        seeded_acc.append(time.perf_counter() - start)
+
+        if seeded["score"] == exhaustive["score"]:
+            agree += 1
+        if exhaustive["score"] > 0:
+            ratios.append(seeded["score"] / exhaustive["score"])
+
+        print(f"Run {i + 1}: len1: {len(s1)}, len2: {len(s2)}, "
+              f"exhaustive: {exhaustive_acc[-1]:.4f}s ({exhaustive['score']}), "
+              f"seeded: {seeded_acc[-1]:.4f}s ({seeded['score']})")
+
+    print(f"Speedup: {sum(exhaustive_acc) / sum(seeded_acc):.1f}x\n")
+    print(f"Score agreement: {agree}/{runs}\n")
+    if ratios:
+        print(f"Mean score ratio: {mean(ratios):.4f}, min: {min(ratios):.4f}\n")
+    return exhaustive_acc, seeded_acc
+
+
+def benchmark_align_many(string_pool: List[List[str]], runs: int = 5, num_candidates: int = 100, top_n: int = 10):
+    """
+    One query vs many candidates, timed as one unit: align_many vs aligning every
+    candidate separately and sorting. Checks that both keep the same top-n scores.
+    """
+    acc, baseline_acc = [], []
+    for i in range(runs):
+        query = random.choice(string_pool)
+        candidates = random.sample(string_pool, num_candidates)
+
+        start = time.perf_counter()
+        results = align_many(query, candidates, top_n)
+        acc.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        baseline = sorted(
+            (smith_waterman_numpy(query, candidate)["score"] for candidate in candidates),
+            reverse=True)[:top_n]
+        baseline_acc.append(time.perf_counter() - start)
+
+        if [result["score"] for result in results] != baseline:
+            print(f"Run {i + 1}: top-{top_n} scores disagree")
+        print(f"Run {i + 1}: len query: {len(query)}, "
+              f"align_many: {acc[-1]:.4f}s, per-pair: {baseline_acc[-1]:.4f}s")
+
+    print(f"align_many avg: {mean(acc):.4f}s, per-pair avg: {mean(baseline_acc):.4f}s, "
+          f"speedup {sum(baseline_acc) / sum(acc):.1f}x\n")
+    return acc
+
+
+def benchmark_pruning(string_pool: List[List[str]], runs: int = 20, num_candidates: int = 100, top_n: int = 10):
+    """
+    align_many with and without upper-bound pruning, reporting how many candidates
+    were pruned before alignment, served from the cache, abandoned mid-pass, or
+    fully scored.
+    """
+    totals = {"candidates": 0, "pruned": 0, "cached": 0, "aborted": 0, "aligned": 0}
+    pruned_acc, full_acc = [], []
+    for i in range(runs):
+        query = random.choice(string_pool)
+        candidates = random.sample(string_pool, num_candidates)
+
+        stats = {}
+        start = time.perf_counter()
+        pruned = align_many(query, candidates, top_n, stats=stats)
+        pruned_acc.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        full = align_many(query, candidates, top_n, prune=False)
+        full_acc.append(time.perf_counter() - start)
+
+        if [r["score"] for r in pruned] != [r["score"] for r in full]:
+            print(f"Run {i + 1}: pruned results disagree")
+        for key, value in stats.items():
+            totals[key] += value
+        print(f"Run {i + 1}: len query: {len(query)}, pruned: {stats['pruned']}, "
+              f"cached: {stats['cached']}, aborted: {stats['aborted']}, aligned: {stats['aligned']}, "
+              f"{pruned_acc[-1]:.4f}s vs {full_acc[-1]:.4f}s")
+
+    print(f"Totals: {totals}\n")
+    print(f"Speedup: {sum(full_acc) / sum(pruned_acc):.1f}x\n")
+    return totals
+
+
+def rerun_top_k(s1: List[str], s2: List[str], k: int) -> List[float]:
+    """
+    Baseline for top-k: re-run full sw k times, masking each found region's tokens
+    with placeholders that can't match.
+    """
+    s1, s2 = list(s1), list(s2)
+    scores = []
+    for _ in range(k):
+        result = smith_waterman_numpy(s1, s2)
+        if result["score"] <= 0:
+            break
+        scores.append(result["score"])
+        # Aligned strings don't carry offsets, so locate them by re-running score-only
+        end_i, end_j = smith_waterman_score(s1, s2)["end"]
+        len_i = len([t for t in result["aligned_target"].split() if t != "-"])
+        len_j = len([t for t in result["aligned_candidate"].split() if t != "-"])
+        s1[end_i - len_i:end_i] = ["MASKED_A"] * len_i
+        s2[end_j - len_j:end_j] = ["MASKED_B"] * len_j
+    return scores
+
+
+def benchmark_top_k(string_pool: List[List[str]], runs: int = 10, k: int = 3, force_longest: bool = False):
+    """
+    Waterman-Eggert top-k vs k full re-runs with masking, and vs the floor of
+    k score-only passes.
+    """
+    longest = max(string_pool, key=len)
+    top_k_acc, rerun_acc, passes_acc = [], [], []
+    for i in range(runs):
+        if force_longest:
+            s1, s2 = random.choice(string_pool), longest
+        else:
+            s1, s2 = random.sample(string_pool, 2)
+
+        start = time.perf_counter()
+        regions = smith_waterman_top_k(s1, s2, k)
+        top_k_acc.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rerun_scores = rerun_top_k(s1, s2, k)
+        rerun_acc.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(max(len(regions), 1)):
+            smith_waterman_score(s1, s2)
+        passes_acc.append(time.perf_counter() - start)
+
+        print(f"Run {i + 1}: len1: {len(s1)}, len2: {len(s2)}, "
+              f"top-k: {top_k_acc[-1]:.4f}s {[float(r['score']) for r in regions]}, "
+              f"re-runs: {rerun_acc[-1]:.4f}s {[float(score) for score in rerun_scores]}, "
+              f"score-only passes: {passes_acc[-1]:.4f}s")
+
+    print(f"top-k avg: {mean(top_k_acc):.4f}s, re-runs avg: {mean(rerun_acc):.4f}s, "
+          f"speedup {sum(rerun_acc) / sum(top_k_acc):.1f}x, "
+          f"vs score-only passes {sum(passes_acc) / sum(top_k_acc):.1f}x\n")
+    return top_k_acc, rerun_acc
+
+
 def worker_sw(pair: Tuple[List[str], List[str]], func) -> float:
     """
     worker at top level otherwise run into pickling issues
@@ -269,8 +568,528 @@ def parallel_benchmark_sw_max_target(func, string_pool: List[List[str]], runs: i
     return acc
 
 
+def benchmark_scheduler(string_pool: List[List[str]], runs: int = 50, workers: int = 8, max_target: int = 10):
+    """
+    Length-aware scheduler vs one future per pair, on a mix of random pairs and
+    pairs forced against the longest section. Both run score-only sw.
+    """
+    longest = max(string_pool, key=len)
+    pairs = [tuple(random.sample(string_pool, 2)) for _ in range(runs)]
+    pairs += [(random.choice(string_pool), longest) for _ in range(max_target)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker_sw, pair, score_only_smith_wat) for pair in pairs]
+        for future in as_completed(futures):
+            future.result()
+    naive = time.perf_counter() - start
+    print(f"One future per pair: {naive:.4f}s")
+
+    stats = {}
+    schedule_alignments(pairs, workers=workers, stats=stats)
+    print(f"Scheduler: {stats['wall']:.4f}s, speedup {naive / stats['wall']:.1f}x")
+    print(f"Jobs: {stats['jobs']}, split pairs: {stats['split_pairs']}")
+    print(f"Throughput: {stats['cells_per_s']:.0f} cells/s, {stats['pairs_per_s']:.1f} pairs/s")
+    for pid, utilisation in sorted(stats["utilisation"].items()):
+        print(f"Worker {pid}: {utilisation:.1%} busy")
+    return stats
+
+
+def benchmark_shared_corpus(string_pool: List[List[str]], runs: int = 10, workers: int = 8):
+    """
+    Forced max length target via the scheduler, sending token lists vs index pairs
+    into a shared-memory corpus. Reports per-task payload size and wall time.
+    """
+    longest_idx = max(range(len(string_pool)), key=lambda i: len(string_pool[i]))
+    sample_idx = [random.randrange(len(string_pool)) for _ in range(runs)]
+    token_pairs = [(string_pool[i], string_pool[longest_idx]) for i in sample_idx]
+    index_pairs = [(i, longest_idx) for i in sample_idx]
+
+    token_bytes = mean(len(pickle.dumps(pair)) for pair in token_pairs)
+    index_bytes = mean(len(pickle.dumps(pair)) for pair in index_pairs)
+    print(f"Avg task payload: tokens {token_bytes:.0f} B, indices {index_bytes:.0f} B")
+
+    stats = {}
+    schedule_alignments(token_pairs, workers=workers, stats=stats)
+    print(f"Token lists: {stats['wall']:.4f}s")
+
+    start = time.perf_counter()
+    corpus, vocab = TokenCorpus.build(string_pool)
+    print(f"Corpus build: {time.perf_counter() - start:.4f}s, "
+          f"{corpus.ids.nbytes / 2**20:.1f} MiB ids, {len(vocab)} distinct tokens")
+    with corpus:
+        stats = {}
+        schedule_alignments(index_pairs, workers=workers, stats=stats, corpus=corpus)
+        print(f"Shared corpus: {stats['wall']:.4f}s")
+    return stats
+
+
+def benchmark_alignment_cache(string_pool: List[List[str]], runs: int = 50):
+    """
+    Align the same sampled pairs twice through a fresh on-disk cache, as two
+    nightly runs would, and report timings and hit/miss counters.
+    """
+    pairs = [tuple(random.sample(string_pool, 2)) for _ in range(runs)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with AlignmentCache(os.path.join(tmp_dir, "alignments.sqlite")) as cache:
+            for label in ("cold", "warm"):
+                start = time.perf_counter()
+                for s1, s2 in pairs:
+                    align(s1, s2, cache=cache)
+                print(f"{label}: {time.perf_counter() - start:.4f}s, {cache.stats()}")
+            return cache.stats()
+
+
+def benchmark_scoring(string_pool: List[List[str]], runs: int = 10, max_cells: int = 2_000_000):
+    """
+    Isolate scoring cost from DP cost: per-cell enhanced_match_score calls vs the
+    compiled per-token arrays, then the DP rows alone given precomputed scores.
+    Runs once with the default rules and once with every bonus rule enabled.
+    """
+    rule_sets = {
+        "default rules": WILKERSON_WEIGHTS,
+        "all rules": {**WILKERSON_WEIGHTS, "digit_bonus": 2.0, "amendatory_bonus": 1.25},
+    }
+    pairs = []
+    while len(pairs) < runs:
+        s1, s2 = random.sample(string_pool, 2)
+        if 0 < len(s1) * len(s2) <= max_cells:
+            pairs.append((s1, s2))
+
+    for label, weights in rule_sets.items():
+        per_cell, compiled, dp = 0.0, 0.0, 0.0
+        cells = 0
+        for s1, s2 in pairs:
+            cells += len(s1) * len(s2)
+
+            start = time.perf_counter()
+            for token1 in s1:
+                for token2 in s2:
+                    enhanced_match_score(token1, token2, weights)
+            per_cell += time.perf_counter() - start
+
+            start = time.perf_counter()
+            target_ids, candidate_ids, target_match = compile_scoring(s1, s2, weights)
+            rows = [row_scores_for(i, target_ids, candidate_ids, target_match, weights)
+                    for i in range(len(s1))]
+            compiled += time.perf_counter() - start
+
+            start = time.perf_counter()
+            row = np.zeros(len(s2) + 1)
+            gap = effective_gap(weights)
+            for row_scores in rows:
+                row, _, _ = fill_row(row, row_scores, gap)
+            dp += time.perf_counter() - start
+
+        print(f"{label}: {cells} cells, per-cell scoring {per_cell:.4f}s, "
+              f"compiled scoring {compiled:.4f}s ({per_cell / compiled:.1f}x), DP rows {dp:.4f}s")
+
+
+def benchmark_tfidf_batch(sections: List[dict], runs: int = 200, top_n: int = 100, workers: int = 8):
+    """
+    Per-query TF-IDF candidate lookups vs the blocked all-vs-all batch mode.
+    """
+    vectorizer, tfidf_matrix = build_tfidf_index(sections)
+    queries = random.sample(sections, min(runs, len(sections)))
+
+    start = time.perf_counter()
+    for query in queries:
+        find_candidate_sections(query, vectorizer, tfidf_matrix, sections, top_n)
+    per_query = (time.perf_counter() - start) / len(queries)
+    print(f"Per-query: {per_query * 1000:.2f} ms/query")
+
+    for pool_size in (None, workers):
+        start = time.perf_counter()
+        triples = sum(len(chunk[0]) for chunk in all_vs_all_candidates(
+            tfidf_matrix, top_n, workers=pool_size))
+        duration = time.perf_counter() - start
+        print(f"All-vs-all batch (workers={pool_size}): {duration:.4f}s, "
+              f"{duration / len(sections) * 1000:.2f} ms/query, {triples} triples")
+
+
+def per_shingle_minhash(text: str, num_perm: int = 128):
+    """
+    MinHash built the old way, one `MinHash.update` per shingle.
+    """
+    m = datasketch.MinHash(num_perm=num_perm)
+    for shingle in [text[i:i+4] for i in range(len(text)-3)]:
+        m.update(shingle.encode('utf-8'))
+    return m
+
+
+def benchmark_minhash_build(sections: List[dict], runs: int = 200, workers: int = 8):
+    """
+    LSH signature build time: per-shingle `MinHash.update` vs bulk NumPy
+    signatures, serial and pooled, plus per-query signature latency.
+    """
+    texts = [section['normalized_output'] for section in sections]
+
+    start = time.perf_counter()
+    for text in texts:
+        per_shingle_minhash(text)
+    baseline = time.perf_counter() - start
+    print(f"Per-shingle update: {baseline:.4f}s for {len(texts)} sections")
+
+    for pool_size in (None, workers):
+        start = time.perf_counter()
+        build_minhash_signatures(sections, workers=pool_size)
+        duration = time.perf_counter() - start
+        print(f"Bulk signatures (workers={pool_size}): {duration:.4f}s, "
+              f"{baseline / duration:.1f}x faster")
+
+    signatures = build_minhash_signatures(sections, workers=workers)
+    start = time.perf_counter()
+    create_minhash_index(sections, signatures=signatures)
+    print(f"LSH insert from saved signatures: {time.perf_counter() - start:.4f}s")
+
+    lsh = create_minhash_index(sections, signatures=signatures)
+    queries = random.sample(sections, min(runs, len(sections)))
+    start = time.perf_counter()
+    for query in queries:
+        per_shingle_minhash(query['normalized_output'])
+    old_query = (time.perf_counter() - start) / len(queries)
+    start = time.perf_counter()
+    for query in queries:
+        lsh_candidate_indices(query, lsh)
+    new_query = (time.perf_counter() - start) / len(queries)
+    print(f"Query signature: per-shingle {old_query * 1000:.2f} ms, "
+          f"bulk signature + LSH lookup {new_query * 1000:.2f} ms")
+
+
+def benchmark_incremental_index(sections: List[dict], batch: int = 50, runs: int = 100):
+    """
+    Adding a day's batch of sections with `add_sections` vs a full rebuild, and
+    the ranking drift each TF-IDF strategy leaves behind.
+    """
+    base, new = sections[:-batch], sections[-batch:]
+
+    start = time.perf_counter()
+    build_all_indexes(sections)
+    print(f"Full rebuild: {time.perf_counter() - start:.4f}s for {len(sections)} sections")
+
+    queries = random.sample(sections, min(runs, len(sections)))
+    for incremental in (False, True):
+        label = "hashed TF-IDF" if incremental else "frozen TF-IDF vocabulary"
+        indexes = build_all_indexes(base, incremental=incremental)
+        start = time.perf_counter()
+        add_sections(indexes, new)
+        added = time.perf_counter() - start
+        start = time.perf_counter()
+        remove_sections(indexes, range(batch))
+        removed = time.perf_counter() - start
+        drift = ranking_drift(indexes, queries)
+        print(f"{label}: add {batch} in {added:.4f}s, remove {batch} in {removed:.4f}s, "
+              f"TF-IDF top-100 overlap {drift['tfidf_overlap']:.3f}, "
+              f"candidate overlap {drift['candidate_overlap']:.3f}")
+
+
+def benchmark_index_snapshot(sections: List[dict], runs: int = 10):
+    """
+    Cold start: `build_all_indexes` vs opening a memory-mapped snapshot.
+    """
+    start = time.perf_counter()
+    indexes = build_all_indexes(sections)
+    print(f"build_all_indexes: {time.perf_counter() - start:.4f}s")
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        start = time.perf_counter()
+        save_snapshot(indexes, snapshot_dir)
+        print(f"save_snapshot: {time.perf_counter() - start:.4f}s")
+
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            load_snapshot(snapshot_dir, sections)
+            times.append(time.perf_counter() - start)
+        print(f"load_snapshot: {mean(times) * 1000:.2f} ms (mean of {runs})")
+
+        start = time.perf_counter()
+        load_snapshot(snapshot_dir, sections, verify=True)
+        print(f"load_snapshot with checksums: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def dict_header_lookup(query_section: dict, header_index: dict) -> List[int]:
+    """
+    The old header lookup: dict counter over every posting, then a full sort.
+    """
+    section_counts = {}
+    for word in set(query_section.get('normalized_header', '').split()):
+        for section_idx in header_index.get(word, ()):
+            section_counts[section_idx] = section_counts.get(section_idx, 0) + 1
+    return [idx for idx, _ in sorted(section_counts.items(), key=lambda x: x[1], reverse=True)]
+
+
+def benchmark_header_index(sections: List[dict], runs: int = 500, top_n: int = 50):
+    """
+    Header lookups: dict-of-lists counter vs IDF-weighted array postings.
+    """
+    dict_index = {}
+    for i, section in enumerate(sections):
+        for word in set(section.get('normalized_header', '').split()):
+            dict_index.setdefault(word, []).append(i)
+    header_index = build_header_index(sections)
+    queries = [random.choice(sections) for _ in range(runs)]
+
+    start = time.perf_counter()
+    touched = [len(dict_header_lookup(query, dict_index)) for query in queries]
+    old = (time.perf_counter() - start) / runs
+    print(f"Dict counter + full sort: {old * 1000:.3f} ms/query, "
+          f"{mean(touched):.0f} sections touched on average")
+
+    start = time.perf_counter()
+    touched = [len(header_candidate_indices(query, header_index)) for query in queries]
+    new = (time.perf_counter() - start) / runs
+    print(f"IDF-weighted postings: {new * 1000:.3f} ms/query, "
+          f"{mean(touched):.0f} sections touched on average")
+
+    start = time.perf_counter()
+    for query in queries:
+        header_candidate_indices(query, header_index, top_n)
+    print(f"IDF-weighted postings, top {top_n}: "
+          f"{(time.perf_counter() - start) / runs * 1000:.3f} ms/query")
+
+
+def benchmark_quote_index(sections: List[dict], runs: int = 500, min_overlaps=(3, 5, 8)):
+    """
+    Quote lookups: exact enclosed_text dict vs the shingle index at a few
+    overlap thresholds, against the TF-IDF stage's latency.
+    """
+    exact_index = {}
+    for i, section in enumerate(sections):
+        for tag in section.get('tags', []):
+            if tag['type'] == 'QUOTE':
+                exact_index.setdefault(tag['enclosed_text'], []).append(i)
+    queries = [random.choice(sections) for _ in range(runs)]
+
+    start = time.perf_counter()
+    found = [len({i for tag in query.get('tags', []) if tag['type'] == 'QUOTE'
+                  for i in exact_index.get(tag['enclosed_text'], ())}) for query in queries]
+    duration = (time.perf_counter() - start) / runs
+    print(f"Exact quotes: {duration * 1000:.3f} ms/query, {mean(found):.1f} candidates, "
+          f"{sum(n > 0 for n in found) / runs:.1%} of queries with any")
+
+    for min_overlap in min_overlaps:
+        quote_index = build_quote_index(sections, min_overlap=min_overlap)
+        start = time.perf_counter()
+        found = [len(quote_candidate_indices(query, quote_index)) for query in queries]
+        duration = (time.perf_counter() - start) / runs
+        print(f"Shingle quotes (min_overlap={min_overlap}): {duration * 1000:.3f} ms/query, "
+              f"{mean(found):.1f} candidates, {sum(n > 0 for n in found) / runs:.1%} of queries with any")
+
+    vectorizer, tfidf_matrix = build_tfidf_index(sections)
+    start = time.perf_counter()
+    for query in queries:
+        tfidf_candidate_indices(query, vectorizer, tfidf_matrix)
+    print(f"TF-IDF stage for reference: {(time.perf_counter() - start) / runs * 1000:.3f} ms/query")
+
+
+def benchmark_candidate_batch(sections: List[dict], runs: int = 500, batch_sizes=(1, 16, 64, 256)):
+    """
+    Combined candidate lookup: one query at a time vs whole batches, with
+    every filter stage run over the batch.
+    """
+    indexes = build_all_indexes(sections)
+    queries = [random.choice(sections) for _ in range(runs)]
+
+    start = time.perf_counter()
+    banded_lsh_index(indexes)
+    print(f"Band tables for bulk LSH lookups: {time.perf_counter() - start:.3f}s, built once")
+
+    start = time.perf_counter()
+    single = [find_candidate_indices(query, indexes) for query in queries]
+    duration = time.perf_counter() - start
+    print(f"Per query: {runs / duration:.1f} queries/s")
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        batched = []
+        for batch_start in range(0, runs, batch_size):
+            batched.extend(find_candidate_indices_batch(queries[batch_start:batch_start + batch_size], indexes))
+        duration = time.perf_counter() - start
+        same = all(np.array_equal(a, b) for a, b in zip(single, batched))
+        print(f"Batches of {batch_size}: {runs / duration:.1f} queries/s, "
+              f"{'identical' if same else 'DIFFERENT'} candidates")
+
+
+def benchmark_candidate_recall(sections: List[dict], num_queries: int = 200, ks=(1, 5, 10), workers: int = 8):
+    """
+    Recall@k, latency and candidate-set size of each candidate filter and the
+    combined pipeline, against exhaustive Smith-Waterman ground truth (cached
+    between runs). The full report is written to candidate_recall.json.
+    """
+    indexes = build_all_indexes(sections)
+    report = candidate_recall_report(sections, indexes, num_queries=num_queries, k=max(ks), ks=ks,
+                                     workers=workers)
+    print(f"Ground truth: {report['ground_truth_seconds']:.1f}s, "
+          f"{report['relevant_per_query']:.1f} relevant sections per query")
+    for name, result in report["filters"].items():
+        recall = ", ".join(f"@{k} {value:.3f}" for k, value in result["recall"].items())
+        latency = result["latency_ms"]
+        print(f"{name}: recall {recall}; latency p50 {latency['p50']:.3f} ms, "
+              f"p99 {latency['p99']:.3f} ms; {result['candidates']['mean']:.1f} candidates on average")
+    return report
+
+
+def benchmark_adaptive_budget(sections: List[dict], num_queries: int = 200, ks=(1, 5, 10), workers: int = 8,
+                              settings=({}, {"min_score": 0.2}, {"drop_ratio": 0.7},
+                                        {"max_cost": 1_000_000})):
+    """
+    Adaptive per-query candidate budgets vs always filling to max_candidates:
+    alignments and DP cells saved, and recall lost, for a few settings.
+    """
+    indexes = build_all_indexes(sections)
+    queries = sorted(random.Random(0).sample(range(len(sections)), min(num_queries, len(sections))))
+    truth = exhaustive_ground_truth(sections, queries, max(ks), "candidate_ground_truth.npz", workers)
+
+    filters = candidate_filters(indexes)
+    baseline = evaluate_filters(sections, {"combined": filters["combined"]}, queries, truth, ks)["combined"]
+    print(f"Fixed budget: {baseline['candidates']['mean']:.1f} alignments, "
+          f"{baseline['alignment_cells']['mean']:.0f} cells per query")
+
+    for setting in settings:
+        runs = []
+
+        def adaptive(query):
+            stats = {}
+            candidates = adaptive_candidate_indices(query, indexes, stats=stats, **setting)
+            runs.append(stats)
+            return candidates
+
+        result = evaluate_filters(sections, {"adaptive": adaptive}, queries, truth, ks)["adaptive"]
+        saved = 1 - result['candidates']['mean'] / max(baseline['candidates']['mean'], 1)
+        cells_saved = 1 - result['alignment_cells']['mean'] / max(baseline['alignment_cells']['mean'], 1)
+        lost = ", ".join(f"@{k} {baseline['recall'][k] - result['recall'][k]:.3f}" for k in ks)
+        print(f"Adaptive {setting or 'defaults'}: {result['candidates']['mean']:.1f} alignments "
+              f"({saved:.1%} saved), {cells_saved:.1%} cells saved, recall lost {lost}")
+        cuts = Counter(stats["cut"] for stats in runs)
+        print(f"  cut by {dict(cuts)}; cost cap dropped {mean(stats['cost_skipped'] for stats in runs):.1f} "
+              f"candidates per query, in {sum(stats['cost_skipped'] > 0 for stats in runs)}/{len(runs)} queries")
+
+
+def benchmark_embedding_pipeline(sections: List[dict], runs: int = 500, batch_size: int = 64):
+    """
+    One `encode_normalized_text` call per text vs length-sorted batches, then
+    the streamed corpus job cold and warm through the embedding cache.
+    """
+    texts = [section['normalized_output'] for section in random.sample(sections, min(runs, len(sections)))
+             if section['normalized_output'].strip()]
+
+    start = time.perf_counter()
+    for text in texts:
+        encode_normalized_text(text)
+    single = time.perf_counter() - start
+    print(f"One call per text: {len(texts) / single:.1f} texts/s")
+
+    start = time.perf_counter()
+    encode_batch(texts, batch_size)
+    batched = time.perf_counter() - start
+    print(f"Length-sorted batches of {batch_size}: {len(texts) / batched:.1f} texts/s "
+          f"({single / batched:.1f}x)")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label in ("cold", "warm"):
+            cache = EmbeddingCache(cache_dir, MODEL_NAME)
+            start = time.perf_counter()
+            embed_sections(sections, cache, batch_size, report=False)
+            duration = time.perf_counter() - start
+            print(f"Corpus job, {label} cache: {len(sections) / duration:.1f} sections/s, "
+                  f"hit rate {cache.stats()['hit_rate']:.1%}")
+
+
+def benchmark_long_section_embedding(sections: List[dict], worker_counts=(0, 1, 2, 4, 8), threads: int = 1):
+    """
+    Windowed embedding of whole sections: sections/s as the worker count
+    grows, each worker capped at `threads` intra-op threads (0 workers runs
+    in this process, uncapped).
+    """
+    texts = [section['normalized_output'] for section in sections]
+    for workers in worker_counts:
+        stats = {}
+        embed_long_sections(texts, workers=workers, threads=threads, stats=stats, report=False)
+        print(f"workers={workers}: {stats['sections_per_s']:.1f} sections/s, "
+              f"{stats['windows']} windows, {stats['wall']:.2f}s")
+
+
+def benchmark_ann_index(embeddings: np.ndarray, runs: int = 500, k: int = 10, n_probes=(1, 2, 4, 8, 16, 32)):
+    """
+    IVF index vs exact dot-product search: recall@k and batch QPS per n_probe.
+    Queries are corpus vectors, as in candidate selection.
+    """
+    queries = embeddings[np.random.default_rng(0).choice(len(embeddings), min(runs, len(embeddings)), replace=False)]
+
+    start = time.perf_counter()
+    exact_ids, _ = exact_search(embeddings, queries, k)
+    exact_qps = len(queries) / (time.perf_counter() - start)
+    print(f"Exact search: {exact_qps:.0f} QPS over {len(embeddings)} vectors")
+
+    start = time.perf_counter()
+    index = IVFIndex.build(embeddings)
+    print(f"IVF build: {time.perf_counter() - start:.4f}s, {len(index.centroids)} lists")
+
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        ids, _ = index.search(queries, k, n_probe)
+        qps = len(queries) / (time.perf_counter() - start)
+        recall = mean(len(np.intersect1d(found, truth)) / len(truth)
+                      for found, truth in zip(ids, exact_ids))
+        print(f"IVF n_probe={n_probe}: recall@{k} {recall:.3f}, {qps:.0f} QPS "
+              f"({qps / exact_qps:.1f}x exact)")
+
+
+def benchmark_int8_embeddings(embeddings: np.ndarray, runs: int = 200, k: int = 100):
+    """
+    int8 vs float32 embedding storage: memory, recall@k against exact float32
+    search, and QPS, with and without float re-ranking.
+    """
+    queries = embeddings[np.random.default_rng(0).choice(len(embeddings), min(runs, len(embeddings)), replace=False)]
+
+    start = time.perf_counter()
+    exact_ids, _ = exact_search(embeddings, queries, k)
+    print(f"float32: {embeddings.nbytes / 2**20:.1f} MiB, "
+          f"{len(queries) / (time.perf_counter() - start):.0f} QPS")
+
+    quantized = Int8Embeddings.quantize(embeddings)
+    for rerank in (False, True):
+        start = time.perf_counter()
+        ids, _ = quantized.search(queries, k, rerank_vectors=embeddings if rerank else None)
+        qps = len(queries) / (time.perf_counter() - start)
+        recall = mean(len(np.intersect1d(found, truth)) / len(truth)
+                      for found, truth in zip(ids, exact_ids))
+        label = "int8 + float re-rank" if rerank else "int8"
+        print(f"{label}: {quantized.nbytes / 2**20:.1f} MiB, recall@{k} {recall:.4f}, {qps:.0f} QPS")
+
+
+def benchmark_import_time(modules=("src.encode", "src.processing.compare_fn", "src.processing.legis_index"), runs: int = 3):
+    """
+    Cold import time of each module in a fresh interpreter, and the model load
+    that src.encode defers to the first get_model() call, also in a fresh
+    interpreter so torch and the model never load into this process, which
+    the SW benchmarks' process pools fork from.
+    """
+    for module in modules:
+        times = []
+        for _ in range(runs):
+            result = subprocess.run(
+                [sys.executable, "-c",
+                 f"import time; start = time.perf_counter(); import {module}; "
+                 f"print(time.perf_counter() - start)"],
+                capture_output=True, text=True, check=True)
+            times.append(float(result.stdout))
+        print(f"import {module}: {min(times) * 1000:.1f} ms (best of {runs})")
+
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import time; from src.encode import get_model; start = time.perf_counter(); "
+         "get_model(); print(time.perf_counter() - start)"],
+        capture_output=True, text=True, check=True)
+    print(f"First get_model() call: {float(result.stdout):.2f}s")
+
+
 # entrypoint
 if __name__ == "__main__":
+    print("Benchmarking import time")
+    benchmark_import_time()
+
     pool, tokenized_pool = load_string_pool()
     # print("Benchmarking custom sw: random draw")
     # benchmark_sw(smith_wat, pool)
@@ -281,3 +1100,87 @@ if __name__ == "__main__":
     # benchmark_sw_max_target(smith_wat, pool)
     print("Benchmarking custom sw: parallel forced max length target")
     parallel_benchmark_sw_max_target(smith_wat, tokenized_pool)
+
+    print("Benchmarking numpy sw: parallel forced max length target")
+    parallel_benchmark_sw_max_target(numpy_smith_wat, tokenized_pool)
+
+    print("Comparing sw engines: random draw")
+    compare_sw_engines(tokenized_pool)
+    print("Comparing sw engines: forced max length target")
+    compare_sw_engines(tokenized_pool, runs=3, force_longest=True)
+
+    print("Benchmarking sw memory: forced max length target")
+    benchmark_sw_memory(
+        [numpy_smith_wat, linear_smith_wat, score_only_smith_wat], tokenized_pool)
+    print("Benchmarking score-only sw: parallel forced max length target")
+    parallel_benchmark_sw_max_target(score_only_smith_wat, tokenized_pool)
+
+    print("Benchmarking seeded sw vs exhaustive: random draw")
+    benchmark_seeded_sw(tokenized_pool, force_longest=False)
+    print("Benchmarking seeded sw vs exhaustive: forced max length target")
+    benchmark_seeded_sw(tokenized_pool)
+
+    print("Benchmarking align_many: 1 query vs 100 candidates, top 10")
+    benchmark_align_many(tokenized_pool)
+
+    print("Benchmarking align_many upper-bound pruning")
+    benchmark_pruning(tokenized_pool)
+
+    print("Benchmarking top-k alignments vs k re-runs: random draw")
+    benchmark_top_k(tokenized_pool)
+    print("Benchmarking top-k alignments vs k re-runs: forced max length target")
+    benchmark_top_k(tokenized_pool, runs=3, force_longest=True)
+
+    print("Benchmarking alignment scheduler vs one future per pair")
+    benchmark_scheduler(tokenized_pool)
+
+    print("Benchmarking shared-memory token corpus: forced max length target")
+    benchmark_shared_corpus(tokenized_pool)
+
+    print("Benchmarking alignment cache: cold vs warm run")
+    benchmark_alignment_cache(tokenized_pool)
+
+    print("Micro-benchmarking match scoring vs DP")
+    benchmark_scoring(tokenized_pool)
+
+    sections = load_sections()
+    print("Benchmarking TF-IDF candidates: per query vs all-vs-all batch")
+    benchmark_tfidf_batch(sections)
+
+    print("Benchmarking MinHash signatures: per-shingle vs bulk NumPy")
+    benchmark_minhash_build(sections)
+
+    print("Benchmarking incremental index updates vs full rebuild")
+    benchmark_incremental_index(sections)
+
+    print("Benchmarking index snapshot load vs rebuild")
+    benchmark_index_snapshot(sections)
+
+    print("Benchmarking header index: dict counter vs IDF-weighted postings")
+    benchmark_header_index(sections)
+
+    print("Benchmarking quote index: exact vs shingle overlap")
+    benchmark_quote_index(sections)
+
+    print("Benchmarking candidate lookup: per query vs batched")
+    benchmark_candidate_batch(sections)
+
+    print("Benchmarking candidate recall vs exhaustive alignment")
+    benchmark_candidate_recall(sections)
+
+    print("Benchmarking adaptive candidate budget vs fixed max_candidates")
+    benchmark_adaptive_budget(sections)
+
+    print("Benchmarking embedding pipeline: single vs batched vs cached")
+    benchmark_embedding_pipeline(sections)
+
+    print("Benchmarking windowed long-section embedding vs worker count")
+    benchmark_long_section_embedding(sections)
+
+    _, embeddings = embed_sections(sections)
+    embeddings = embeddings[np.linalg.norm(embeddings, axis=1) > 0]
+    print("Benchmarking IVF embedding index vs exact search")
+    benchmark_ann_index(embeddings)
+
+    print("Benchmarking int8 embedding storage vs float32")
+    benchmark_int8_embeddings(embeddings)
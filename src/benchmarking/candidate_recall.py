@@ -0,0 +1,230 @@
+"""
+Recall and latency of the candidate stage against exhaustive Smith-Waterman.
+
+Ground truth is the exact top-k alignment hits of each sampled query over the
+whole corpus, found with `align_many` across a process pool and cached in an
+.npz file keyed by a fingerprint of the corpus, the sample and the scoring
+rules. Each filter of `find_candidate_indices`, the combined pipeline and its
+adaptive-budget variant are then timed per query and scored by the share of
+true hits their candidate sets contain, and by their alignment cost. The
+report is a plain dict, written as JSON.
+"""
+
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.processing.compare_fn import SCORING_VERSION, WILKERSON_WEIGHTS, align_many
+from src.processing.legis_index import (adaptive_candidate_indices, find_candidate_indices,
+                                        header_candidate_indices, lsh_candidate_indices,
+                                        quote_candidate_indices, tfidf_candidate_indices)
+
+# Tokenized corpus in each ground truth worker, set by init_ground_truth_worker
+CORPUS_TOKENS = None
+
+# Ground truth hits scoring below this are noise, e.g. a few shared words
+MIN_RELEVANT_SCORE = 20
+
+
+def corpus_fingerprint(sections, queries, k, weights=WILKERSON_WEIGHTS):
+    """
+    Hash of everything the ground truth depends on: section texts, sampled
+    queries, k, the scoring weights and `SCORING_VERSION`.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{SCORING_VERSION}|{sorted(weights.items())}|{k}|{list(queries)}".encode("utf-8"))
+    for section in sections:
+        digest.update(b"\x1e")
+        digest.update(section['normalized_output'].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def init_ground_truth_worker(corpus_tokens):
+    global CORPUS_TOKENS
+    CORPUS_TOKENS = corpus_tokens
+
+
+def worker_ground_truth(query, k, weights):
+    """
+    worker at top level otherwise run into pickling issues
+    """
+    hits = align_many(CORPUS_TOKENS[query], CORPUS_TOKENS, top_n=k + 1, weights=weights)
+    hits = [hit for hit in hits if hit["index"] != query][:k]
+    indices = np.full(k, -1, dtype=np.int64)
+    scores = np.zeros(k)
+    indices[:len(hits)] = [hit["index"] for hit in hits]
+    scores[:len(hits)] = [hit["score"] for hit in hits]
+    return indices, scores
+
+
+def exhaustive_ground_truth(sections, queries, k=10, path=None, workers=8, weights=WILKERSON_WEIGHTS):
+    """
+    Exact top-k Smith-Waterman hits of each query section over all others.
+
+    Args:
+        sections: Parsed sections, the whole corpus.
+        queries: Indices of the sampled query sections.
+        k: Hits kept per query.
+        path: Optional .npz cache file, reused while its fingerprint matches.
+        workers: Process pool size; None or 0 aligns in this process.
+        weights: Smith-Waterman scoring parameters.
+
+    Returns:
+        tuple: (indices, scores), both (len(queries), k), best first; missing
+        hits are index -1 with score 0
+    """
+    fingerprint = corpus_fingerprint(sections, queries, k, weights)
+    if path is not None and os.path.exists(path):
+        cached = np.load(path)
+        if str(cached["fingerprint"]) == fingerprint:
+            return cached["indices"], cached["scores"]
+
+    corpus_tokens = [section['normalized_output'].split() for section in sections]
+    if not workers:
+        init_ground_truth_worker(corpus_tokens)
+        results = [worker_ground_truth(query, k, weights) for query in queries]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_ground_truth_worker,
+                                 initargs=(corpus_tokens,)) as executor:
+            results = list(executor.map(worker_ground_truth, queries,
+                                        [k] * len(queries), [weights] * len(queries)))
+
+    indices = np.array([found for found, _ in results], dtype=np.int64).reshape(len(queries), k)
+    scores = np.array([found for _, found in results], dtype=np.float64).reshape(len(queries), k)
+    if path is not None:
+        np.savez(path, fingerprint=fingerprint, indices=indices, scores=scores)
+    return indices, scores
+
+
+def candidate_filters(indexes, max_candidates=100, header_top_n=50, adaptive=None):
+    """
+    Each candidate stage of `find_candidate_indices` on its own, plus the
+    combined pipeline and its adaptive-budget variant (with `adaptive` as
+    keyword arguments to `adaptive_candidate_indices`), as functions of a
+    query section.
+    """
+    return {
+        "quote": lambda query: quote_candidate_indices(query, indexes['quote_index']),
+        "header": lambda query: header_candidate_indices(query, indexes['header_index'], header_top_n),
+        "lsh": lambda query: lsh_candidate_indices(query, indexes['lsh_index']),
+        "tfidf": lambda query: tfidf_candidate_indices(
+            query, indexes['vectorizer'], indexes['tfidf_matrix'], max_candidates),
+        "combined": lambda query: find_candidate_indices(query, indexes, max_candidates),
+        "adaptive": lambda query: adaptive_candidate_indices(
+            query, indexes, max_candidates, **(adaptive or {})),
+    }
+
+
+def latency_summary(seconds):
+    """
+    Mean and percentiles of per-query latencies, in milliseconds.
+    """
+    ms = np.asarray(seconds) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"mean": float(ms.mean()), "p50": float(p50), "p90": float(p90), "p99": float(p99),
+            "max": float(ms.max())}
+
+
+def evaluate_filters(sections, filters, queries, truth, ks=(1, 5, 10), min_score=MIN_RELEVANT_SCORE):
+    """
+    Recall@k, latency, candidate-set size and alignment cost of each filter.
+
+    A query's relevant sections at k are its true top-k hits scoring at least
+    `min_score`; recall@k is the share of them, over all queries, found in the
+    filter's candidate set. The query itself never counts as a candidate.
+
+    Args:
+        sections: Parsed sections the indexes were built over.
+        filters: Name -> function of a query section returning candidate indices.
+        queries: Indices of the query sections.
+        truth: (indices, scores) from `exhaustive_ground_truth`.
+        ks: Cutoffs to report recall at.
+        min_score: Smallest alignment score counted as relevant.
+
+    Returns:
+        dict: filter name -> { "recall": {k: recall}, "latency_ms": {...},
+        "candidates": {"mean", "p50", "p90", "max"}, "alignment_cells":
+        {"mean", "p90", "max"} }, cells being query tokens x candidate tokens
+        summed over candidates
+    """
+    truth_indices, truth_scores = truth
+    relevant = np.where(truth_scores >= min_score, truth_indices, -1)
+    token_lengths = np.array([len(section['normalized_output'].split()) for section in sections],
+                             dtype=np.int64)
+
+    report = {}
+    for name, find in filters.items():
+        latencies, sizes, cells = [], [], []
+        found = {k: 0 for k in ks}
+        for row, query in enumerate(queries):
+            start = time.perf_counter()
+            candidates = find(sections[query])
+            latencies.append(time.perf_counter() - start)
+            candidates = np.asarray(candidates, dtype=np.int64)
+            candidates = candidates[candidates != query]
+            sizes.append(len(candidates))
+            cells.append(int(token_lengths[query] * token_lengths[candidates].sum()))
+            for k in ks:
+                hits = relevant[row, :k]
+                found[k] += int(np.isin(hits[hits >= 0], candidates).sum())
+
+        report[name] = {
+            "recall": {k: found[k] / max(int((relevant[:, :k] >= 0).sum()), 1) for k in ks},
+            "latency_ms": latency_summary(latencies),
+            "candidates": {
+                "mean": float(np.mean(sizes)),
+                "p50": float(np.percentile(sizes, 50)),
+                "p90": float(np.percentile(sizes, 90)),
+                "max": int(np.max(sizes)),
+            },
+            "alignment_cells": {
+                "mean": float(np.mean(cells)),
+                "p90": float(np.percentile(cells, 90)),
+                "max": int(np.max(cells)),
+            },
+        }
+    return report
+
+
+def candidate_recall_report(sections, indexes, num_queries=200, k=10, ks=(1, 5, 10), seed=0,
+                            min_score=MIN_RELEVANT_SCORE, ground_truth_path="candidate_ground_truth.npz",
+                            output_path="candidate_recall.json", workers=8, max_candidates=100,
+                            adaptive=None):
+    """
+    Sample queries, load or compute their ground truth, evaluate every filter
+    and write the report as JSON.
+
+    Returns:
+        dict: the report, with the run's parameters under "config"
+    """
+    queries = sorted(random.Random(seed).sample(range(len(sections)), min(num_queries, len(sections))))
+
+    start = time.perf_counter()
+    truth = exhaustive_ground_truth(sections, queries, k, ground_truth_path, workers)
+    ground_truth_seconds = time.perf_counter() - start
+
+    report = {
+        "config": {
+            "sections": len(sections),
+            "queries": len(queries),
+            "k": k,
+            "seed": seed,
+            "min_score": min_score,
+            "max_candidates": max_candidates,
+            "adaptive": adaptive or {},
+            "scoring_version": SCORING_VERSION,
+        },
+        "ground_truth_seconds": ground_truth_seconds,
+        "relevant_per_query": float((truth[1] >= min_score).sum(axis=1).mean()),
+        "filters": evaluate_filters(sections, candidate_filters(indexes, max_candidates, adaptive=adaptive),
+                                    queries, truth, ks, min_score),
+    }
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
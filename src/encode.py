@@ -1,7 +1,56 @@
-from sentence_transformers import SentenceTransformer
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Loaded on first use by get_model, once per process
+MODEL = None
+MODEL_LOCK = threading.Lock()
+
+# Long sections are embedded as overlapping word windows; MiniLM truncates at
+# 256 word pieces, which a window of this many words stays under
+WINDOW_WORDS = 160
+WINDOW_OVERLAP = 32
+
+
+def get_model():
+    """
+    The sentence transformer, loaded on first call. Thread safe: concurrent
+    first callers wait for a single load.
+    """
+    global MODEL
+    if MODEL is None:
+        with MODEL_LOCK:
+            if MODEL is None:
+                # Deferred so importing this module doesn't pull in torch
+                from sentence_transformers import SentenceTransformer
+                MODEL = SentenceTransformer(MODEL_NAME)
+    return MODEL
+
+
+def init_encoder_worker(threads=None):
+    """
+    Process-pool initializer: cap intra-op threads so workers don't
+    oversubscribe the cores, then load the model once per worker, up front.
+    """
+    if threads:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        import torch
+        torch.set_num_threads(threads)
+    get_model()
+
+
+def __getattr__(name):
+    # Keep `src.encode.model` working, loading it on first access
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def encode_normalized_text(text: str) -> np.ndarray:
@@ -14,7 +63,188 @@ def encode_normalized_text(text: str) -> np.ndarray:
     if not text.strip():
         raise ValueError("Text is empty")
 
-    normalized_text = model.encode(
+    normalized_text = get_model().encode(
         [text], normalize_embeddings=True)
 
     return normalized_text[0]
+
+
+def encode_batch(texts, batch_size=64) -> np.ndarray:
+    """
+    Encode many texts to normalized embedding vectors. Texts are sorted by
+    length so each batch pads to similar lengths; empty texts get zero vectors.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(texts), dim), in input order
+    """
+    model = get_model()
+    vectors = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    order = sorted((i for i, text in enumerate(texts) if text.strip()), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        vectors[batch] = model.encode(
+            [texts[i] for i in batch], batch_size=batch_size, normalize_embeddings=True)
+    return vectors
+
+
+def encode_cached(texts, cache, batch_size=64) -> np.ndarray:
+    """
+    `encode_batch` through an `EmbeddingCache`: only texts never seen before
+    are encoded, and they're added to the cache.
+    """
+    vectors, found = cache.get_many(texts)
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        texts_missing = [texts[i] for i in missing]
+        vectors[missing] = encode_batch(texts_missing, batch_size)
+        cache.put_many(texts_missing, vectors[missing])
+    return vectors
+
+
+def embed_sections(sections, cache=None, batch_size=64, chunk_size=2048, report=True):
+    """
+    Header and content embeddings for a whole corpus in one streamed job.
+    Sections are processed in chunks, printing progress and throughput after
+    each one.
+
+    Args:
+        sections: Parsed sections with 'normalized_header' and 'normalized_output'.
+        cache: Optional `EmbeddingCache`; cached texts aren't re-encoded.
+        batch_size: Texts per `model.encode` call.
+        chunk_size: Sections per progress step.
+        report: Print progress lines.
+
+    Returns:
+        tuple: (header vectors, content vectors), each (len(sections), dim)
+    """
+    dim = get_model().get_sentence_embedding_dimension()
+    headers = np.zeros((len(sections), dim), dtype=np.float32)
+    contents = np.zeros((len(sections), dim), dtype=np.float32)
+
+    start = time.perf_counter()
+    for chunk_start in range(0, len(sections), chunk_size):
+        chunk = sections[chunk_start:chunk_start + chunk_size]
+        texts = [section.get('normalized_header', '') for section in chunk] + \
+            [section['normalized_output'] for section in chunk]
+        if cache is not None:
+            vectors = encode_cached(texts, cache, batch_size)
+        else:
+            vectors = encode_batch(texts, batch_size)
+        chunk_end = chunk_start + len(chunk)
+        headers[chunk_start:chunk_end] = vectors[:len(chunk)]
+        contents[chunk_start:chunk_end] = vectors[len(chunk):]
+
+        if report:
+            elapsed = time.perf_counter() - start
+            line = f"Embedded {chunk_end}/{len(sections)} sections, {chunk_end / elapsed:.1f} sections/s"
+            if cache is not None:
+                line += f", cache hit rate {cache.stats()['hit_rate']:.1%}"
+            print(line)
+
+    return headers, contents
+
+
+def section_windows(text, window_words=WINDOW_WORDS, overlap=WINDOW_OVERLAP):
+    """
+    Split text into windows of `window_words` words, each overlapping the
+    previous one by `overlap` words. Short texts are a single window.
+    """
+    words = text.split()
+    if len(words) <= window_words:
+        return [" ".join(words)] if words else []
+    step = window_words - overlap
+    return [" ".join(words[start:start + window_words])
+            for start in range(0, len(words) - overlap, step)]
+
+
+def worker_encode_windows(windows, batch_size):
+    """
+    worker at top level otherwise run into pickling issues
+    """
+    return encode_batch(windows, batch_size)
+
+
+def embed_long_sections(texts, workers=4, threads=1, window_words=WINDOW_WORDS, overlap=WINDOW_OVERLAP,
+                        batch_size=64, windows_per_task=256, stats=None, report=True):
+    """
+    Embed texts of any length: every text is split into overlapping windows,
+    windows from many texts are encoded together across a process pool, and
+    each text's window vectors are averaged (weighted by window length) and
+    re-normalized into one vector.
+
+    Args:
+        texts: Texts to embed, e.g. each section's normalized_output.
+        workers: Process pool size, started with "spawn"; None or 0 encodes in
+            this process.
+        threads: Intra-op thread cap per worker.
+        window_words: Words per window.
+        overlap: Words shared by consecutive windows.
+        batch_size: Windows per `model.encode` call.
+        windows_per_task: Windows sent to a worker at once.
+        stats: Optional dict, filled with "sections", "windows", "wall" and
+            "sections_per_s".
+        report: Print progress after each finished task.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(texts), dim), zero rows for
+        empty texts
+    """
+    windows, owners, lengths = [], [], []
+    for i, text in enumerate(texts):
+        for window in section_windows(text, window_words, overlap):
+            windows.append(window)
+            owners.append(i)
+            lengths.append(len(window.split()))
+    tasks = [windows[start:start + windows_per_task]
+             for start in range(0, len(windows), windows_per_task)]
+
+    start = time.perf_counter()
+    encoded = []
+
+    def progress():
+        if report:
+            done = sum(len(block) for block in encoded)
+            elapsed = time.perf_counter() - start
+            print(f"Encoded {done}/{len(windows)} windows, {done / elapsed:.1f} windows/s")
+
+    if not workers:
+        for task in tasks:
+            encoded.append(encode_batch(task, batch_size))
+            progress()
+    else:
+        # Spawn rather than fork: forking a parent that already holds torch's
+        # thread pools (or a loaded model) can deadlock the workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_encoder_worker, initargs=(threads,)) as executor:
+            # Keep a bounded window of tasks in flight, collecting in order
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(worker_encode_windows, task, batch_size))
+                if len(pending) >= 2 * workers:
+                    encoded.append(pending.popleft().result())
+                    progress()
+            while pending:
+                encoded.append(pending.popleft().result())
+                progress()
+
+    dim = encoded[0].shape[1] if encoded else get_model().get_sentence_embedding_dimension()
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    if windows:
+        weighted = np.concatenate(encoded) * np.asarray(lengths, dtype=np.float32)[:, None]
+        owners = np.asarray(owners)
+        firsts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        sums = np.add.reduceat(weighted, firsts, axis=0)
+        vectors[owners[firsts]] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    wall = time.perf_counter() - start
+
+    if stats is not None:
+        stats.update({
+            "sections": len(texts),
+            "windows": len(windows),
+            "wall": wall,
+            "sections_per_s": len(texts) / wall if wall else 0,
+        })
+    if report:
+        print(f"Embedded {len(texts)} sections in {wall:.2f}s, {len(texts) / wall:.1f} sections/s")
+
+    return vectors
@@ -0,0 +1,205 @@
+"""
+Persistent cache of Smith-Waterman results, keyed by content hash.
+
+Bill versions (ih, rh, eh, enr, ...) repeat many sections word for word, so the
+nightly run keeps realigning identical token sequences. Entries are keyed by a
+hash of both token sequences, the scoring weights and `SCORING_VERSION`, and
+stored in SQLite with least-recently-used eviction once the cache outgrows
+`max_bytes`. Lookups and writes are batched into one transaction until
+`flush()`, which `align` and `align_many` call once per call.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+from src.processing.compare_fn import SCORING_VERSION, WILKERSON_WEIGHTS, alignment_offsets
+
+# Default size limit for cached payloads
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+# Pending lookups and writes that force a commit before the next flush()
+COMMIT_EVERY = 1000
+
+
+def alignment_key(target, candidate, method="exact", weights=WILKERSON_WEIGHTS):
+    """
+    Content hash identifying an alignment: both token sequences, the alignment
+    method, the scoring weights and the scoring rules version.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{SCORING_VERSION}|{method}|{sorted(weights.items())}".encode("utf-8"))
+    for tokens in (target, candidate):
+        digest.update(b"\x1e")
+        digest.update("\x1f".join(tokens).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AlignmentCache:
+    """
+    SQLite-backed alignment cache with size-based LRU eviction.
+
+    Entries hold the score and end cell, and optionally the aligned strings and
+    token offsets (score-only entries leave those empty). Hits only record
+    their access time in memory, and writes stay uncommitted, until `flush()`
+    or `commit_every` pending operations.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, commit_every=COMMIT_EVERY):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.touched = {}
+        self.pending = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, a crash can lose only the last commits, never corrupt the file
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS alignments (
+                key TEXT PRIMARY KEY,
+                score REAL NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS alignments_last_access ON alignments (last_access)")
+        self.conn.commit()
+        self.size = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM alignments").fetchone()[0]
+
+    def get(self, target, candidate, method="exact", weights=WILKERSON_WEIGHTS):
+        """
+        Look up a cached alignment.
+
+        Returns:
+            dict or None: { "score", "end", "aligned_target", "aligned_candidate",
+            "offsets" }, with the last three None for score-only entries.
+        """
+        key = alignment_key(target, candidate, method, weights)
+        row = self.conn.execute(
+            "SELECT score, payload FROM alignments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.touched[key] = time.time()
+        self.operation_done()
+        payload = json.loads(row[1])
+        return {"score": row[0], **payload}
+
+    def put(self, target, candidate, result, method="exact", weights=WILKERSON_WEIGHTS):
+        """
+        Store an alignment result: { "score", "end" }, plus "aligned_target" and
+        "aligned_candidate" when a traceback was run. A full entry is never
+        replaced by a score-only one.
+        """
+        key = alignment_key(target, candidate, method, weights)
+        aligned_target = result.get("aligned_target")
+        aligned_candidate = result.get("aligned_candidate")
+        end = result.get("end")
+        if aligned_target is None:
+            existing = self.conn.execute(
+                "SELECT payload FROM alignments WHERE key = ?", (key,)).fetchone()
+            if existing is not None:
+                return
+
+        payload = json.dumps({
+            "end": [int(end[0]), int(end[1])] if end is not None else None,
+            "aligned_target": aligned_target,
+            "aligned_candidate": aligned_candidate,
+            "offsets": alignment_offsets(end, aligned_target, aligned_candidate)
+            if end is not None and aligned_target is not None else None,
+        })
+        size = len(key) + len(payload)
+
+        previous = self.conn.execute(
+            "SELECT size FROM alignments WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO alignments (key, score, payload, size, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, float(result["score"]), payload, size, time.time()))
+        self.touched.pop(key, None)
+        self.size += size - (previous[0] if previous else 0)
+
+        if self.size > self.max_bytes:
+            self.evict()
+        self.operation_done()
+
+    def operation_done(self):
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.flush()
+
+    def write_touched(self):
+        """
+        Write the access times recorded by hits since the last flush.
+        """
+        if self.touched:
+            self.conn.executemany(
+                "UPDATE alignments SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self.touched.items()])
+            self.touched = {}
+
+    def flush(self):
+        """
+        Commit pending access times and writes in one transaction.
+        """
+        self.write_touched()
+        self.conn.commit()
+        self.pending = 0
+
+    def evict(self, target_fraction=0.9):
+        """
+        Drop least recently used entries until the cache is under
+        `target_fraction` of `max_bytes`.
+        """
+        excess = self.size - int(self.max_bytes * target_fraction)
+        if excess <= 0:
+            return
+        self.write_touched()
+        freed, keys = 0, []
+        for key, size in self.conn.execute(
+                "SELECT key, size FROM alignments ORDER BY last_access"):
+            keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM alignments WHERE key = ?", keys)
+        self.size -= freed
+        self.evictions += len(keys)
+
+    def stats(self):
+        """
+        Hit, miss and eviction counters, plus current entry count and size.
+        """
+        entries = self.conn.execute("SELECT COUNT(*) FROM alignments").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self.size,
+        }
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,32 +2,65 @@
 TODO
 """
 
+import heapq
+
 import numpy as np
 
+# Smith-Waterman scoring parameters. Here I'm using Wilkerson (2015) weights.
+WILKERSON_WEIGHTS = {
+    "match": 2,  # Matching words
+    "mismatch": -1,  # Mismatched words
+    "gap_open": -5,  # Opening a gap
+    "gap_extend": -0.5,  # Extending an existing gap
+    # Match multipliers, first applicable one wins. None turns a rule off.
+    "quote_bonus": 1.5,  # Matches in quoted text
+    "digit_bonus": None,  # Numbers (section numbers, dollar amounts, etc.), e.g. 2.0
+    "amendatory_bonus": None,  # Terms of structural significance, e.g. 1.25
+}
 
-def enhanced_match_score(token1, token2, weights):
-    # Exact match case
-    if token1 == token2:
-        # Higher weight for matches in quoted text
-        if "<QUOTE>" in token1 or "<QUOTED_BLOCK>" in token1:
-            return weights["match"] * 1.5
+# Terms that indicate structural significance, for "amendatory_bonus"
+AMENDATORY_TERMS = ["amended", "striking", "inserting", "adding"]
 
-        # # Higher weight for numbers (section numbers, dollar amounts, etc.)
-        # if any(c.isdigit() for c in token1):
-        #     return weights["match"] * 2.0
+# Bump whenever the match scoring rules change, so cached alignments are invalidated
+SCORING_VERSION = 2
 
-        # # Higher weight for specific terms that indicate structural significance
-        # important_terms = ["amended", "striking", "inserting", "adding"]
-        # if any(term in token1 for term in important_terms):
-        #     return weights["match"] * 1.25
 
-        # Regular match
-        return weights["match"]
+def match_multiplier(token, weights):
+    """
+    Bonus multiplier for an exact match on `token`. Weights without bonus keys
+    keep the original quote-only rule.
+    """
+    # Higher weight for matches in quoted text
+    quote_bonus = weights.get("quote_bonus", 1.5)
+    if quote_bonus and ("<QUOTE>" in token or "<QUOTED_BLOCK>" in token):
+        return quote_bonus
+
+    # Higher weight for numbers (section numbers, dollar amounts, etc.)
+    digit_bonus = weights.get("digit_bonus")
+    if digit_bonus and any(c.isdigit() for c in token):
+        return digit_bonus
+
+    # Higher weight for specific terms that indicate structural significance
+    amendatory_bonus = weights.get("amendatory_bonus")
+    if amendatory_bonus and any(term in token for term in AMENDATORY_TERMS):
+        return amendatory_bonus
+
+    return 1
+
+
+def enhanced_match_score(token1, token2, weights):
+    # Exact match case
+    if token1 == token2:
+        return weights["match"] * match_multiplier(token1, weights)
 
     # Not a match
     return weights["mismatch"]
 
 
+# Rows between checks for abandoning a score pass that can't make the cut
+ABORT_CHECK_EVERY = 16
+
+
 def smith_waterman(target, candidate):
     """
     Comparing two text sequences using the Smith-Waterman local alignment algorithm.
@@ -46,12 +79,7 @@ def smith_waterman(target, candidate):
     """
 
     # Smith-Waterman scoring parameters. Here I'm using Wilkerson (2015) weights.
-    weights = {
-        "match": 2,  # Matching words
-        "mismatch": -1,  # Mismatched words
-        "gap_open": -5,  # Opening a gap
-        "gap_extend": -0.5,  # Extending an existing gap
-    }
+    weights = WILKERSON_WEIGHTS
 
     # Get lengths of tokenized sequences
     m, n = len(target), len(candidate)
@@ -125,3 +153,967 @@ def smith_waterman(target, candidate):
         "aligned_target": " ".join(reversed(aligned_target)),
         "aligned_candidate": " ".join(reversed(aligned_candidate)),
     }
+
+
+def encode_token_pair(target, candidate):
+    """
+    Encode two token lists as integer id arrays over a shared vocabulary.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+
+    Returns:
+        tuple: (target_ids, candidate_ids), both np.ndarray of int64.
+    """
+    vocab = {}
+    target_ids = np.fromiter(
+        (vocab.setdefault(token, len(vocab)) for token in target),
+        dtype=np.int64, count=len(target))
+    candidate_ids = np.fromiter(
+        (vocab.setdefault(token, len(vocab)) for token in candidate),
+        dtype=np.int64, count=len(candidate))
+    return target_ids, candidate_ids
+
+
+def match_weights(tokens, weights):
+    """
+    Per-token match score, following the rules in `enhanced_match_score`. The
+    rules are evaluated once per distinct token, so enabling more of them adds
+    nothing to the per-cell cost.
+
+    Args:
+        tokens (list of str): Tokenized sequence.
+        weights (dict): Smith-Waterman scoring parameters.
+
+    Returns:
+        np.ndarray: Score awarded when the token at each position is matched.
+    """
+    compiled = {}
+    for token in tokens:
+        if token not in compiled:
+            compiled[token] = weights["match"] * match_multiplier(token, weights)
+    return np.array([compiled[token] for token in tokens], dtype=np.float64)
+
+
+def compile_scoring(target, candidate, weights):
+    """
+    Compile the scoring rules for one pair into arrays: shared-vocabulary token
+    ids for both sequences, and the match score of every target position. A cell
+    then scores as target_match[i] where the ids agree, weights["mismatch"] elsewhere.
+
+    Returns:
+        tuple: (target_ids, candidate_ids, target_match)
+    """
+    target_ids, candidate_ids = encode_token_pair(target, candidate)
+    return target_ids, candidate_ids, match_weights(target, weights)
+
+
+def effective_gap(weights):
+    """
+    The reference recurrence applies both the open and the extend penalty to the
+    same neighbouring cell, so the penalty that actually applies is the larger one.
+    """
+    return max(weights["gap_open"], weights["gap_extend"])
+
+
+def fill_row(prev_row, row_scores, gap):
+    """
+    Compute one row of the Smith-Waterman score matrix from the previous one.
+
+    The left-neighbour dependency within the row is resolved with a running max:
+    H[j] = max over k <= j of (best[k] + gap * (j - k)), where best[k] is the
+    cell score ignoring the left neighbour. Cells won by best[j] itself are kept
+    exactly; left-gap cells can differ from the reference recurrence by rounding
+    when the weights aren't dyadic, so tracebacks compare with a tolerance.
+
+    Args:
+        prev_row (np.ndarray): Row i - 1 of the score matrix, length n + 1.
+        row_scores (np.ndarray): Match/mismatch score of target[i - 1] against
+            every candidate token, length n.
+        gap (float): Effective gap penalty.
+
+    Returns:
+        tuple: (row, diag, up), where diag and up are the length-n diagonal and
+        vertical move scores, kept for traceback.
+    """
+    diag = prev_row[:-1] + row_scores
+    up = prev_row[1:] + gap
+    best = np.maximum(np.maximum(diag, up), 0)
+    ramp = gap * np.arange(1, len(row_scores) + 1)
+    row = np.empty_like(prev_row)
+    row[0] = 0
+    row[1:] = np.maximum(best, np.maximum.accumulate(best - ramp) + ramp)
+    return row, diag, up
+
+
+def traceback_row(row, diag, up, gap):
+    """
+    Traceback directions for one row, with the same precedence as `smith_waterman`:
+    1 diagonal, 2 up, 3 left, 0 none.
+    """
+    left = row[:-1] + gap
+    cells = row[1:]
+    directions = np.zeros(len(row), dtype=np.int8)
+    directions[1:] = np.where(np.isclose(cells, diag), 1, np.where(
+        np.isclose(cells, up), 2, np.where(np.isclose(cells, left), 3, 0)))
+    return directions
+
+
+def row_scores_for(i, target_ids, candidate_ids, target_match, weights):
+    """
+    Match/mismatch scores of target token i against every candidate token.
+    """
+    return np.where(candidate_ids == target_ids[i], target_match[i], weights["mismatch"])
+
+
+def trace_alignment(target, candidate, score_matrix, traceback_matrix, end):
+    """
+    Backtrack from `end` until the first zero score, recovering aligned sequences.
+
+    Returns:
+        dict: { "aligned_target": str, "aligned_candidate": str }
+    """
+    aligned_target = []
+    aligned_candidate = []
+    i, j = end
+
+    while i > 0 and j > 0 and score_matrix[i, j] > 0:
+        if traceback_matrix[i, j] == 1:  # Diagonal (match/mismatch)
+            aligned_target.append(target[i - 1])
+            aligned_candidate.append(candidate[j - 1])
+            i -= 1
+            j -= 1
+        elif traceback_matrix[i, j] == 2:  # Up (gap in candidate)
+            aligned_target.append(target[i - 1])
+            aligned_candidate.append("-")
+            i -= 1
+        elif traceback_matrix[i, j] == 3:  # Left (gap in target)
+            aligned_target.append("-")
+            aligned_candidate.append(candidate[j - 1])
+            j -= 1
+        else:
+            break
+
+    return {
+        "aligned_target": " ".join(reversed(aligned_target)),
+        "aligned_candidate": " ".join(reversed(aligned_candidate)),
+    }
+
+
+def smith_waterman_numpy(target, candidate, weights=WILKERSON_WEIGHTS):
+    """
+    Vectorized Smith-Waterman, producing the same score and aligned strings as
+    `smith_waterman`.
+
+    Tokens are encoded as integer ids, and the matrix is filled one row at a
+    time with NumPy instead of calling `enhanced_match_score` once per cell.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+        weights (dict): Smith-Waterman scoring parameters.
+
+    Returns:
+        dict: { "score": int, "aligned_target": str, "aligned_candidate": str }
+    """
+    m, n = len(target), len(candidate)
+    if m == 0 or n == 0:
+        return {"score": 0, "aligned_target": "", "aligned_candidate": ""}
+
+    target_ids, candidate_ids, target_match = compile_scoring(target, candidate, weights)
+    gap = effective_gap(weights)
+
+    score_matrix = np.zeros((m + 1, n + 1))
+    traceback_matrix = np.zeros((m + 1, n + 1), dtype=np.int8)
+
+    best_score = 0
+    best_pos = (0, 0)
+
+    for i in range(1, m + 1):
+        row, diag, up = fill_row(
+            score_matrix[i - 1],
+            row_scores_for(i - 1, target_ids, candidate_ids, target_match, weights), gap)
+        score_matrix[i] = row
+        traceback_matrix[i] = traceback_row(row, diag, up, gap)
+
+        # First column holding the row max, matching the reference's row-major scan
+        j = int(np.argmax(row))
+        if row[j] > best_score:
+            best_score = row[j]
+            best_pos = (i, j)
+
+    return {
+        "score": best_score,
+        **trace_alignment(target, candidate, score_matrix, traceback_matrix, best_pos),
+    }
+
+
+def smith_waterman_score(target, candidate, weights=WILKERSON_WEIGHTS):
+    """
+    Score-only Smith-Waterman in linear memory.
+
+    Only the previous and current rows are kept, so memory is O(n) instead of
+    two (m+1)x(n+1) matrices. Use `smith_waterman_traceback` afterwards for the
+    few alignments that are actually kept.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+        weights (dict): Smith-Waterman scoring parameters.
+
+    Returns:
+        dict: { "score": float, "end": (i, j) }, where end is the best cell, chosen
+        exactly as `smith_waterman` chooses its traceback start.
+    """
+    if len(target) == 0 or len(candidate) == 0:
+        return {"score": 0, "end": (0, 0)}
+
+    score, end = score_encoded(*compile_scoring(target, candidate, weights), weights)
+    return {"score": score, "end": end}
+
+
+def score_encoded(target_ids, candidate_ids, target_match, weights, min_score=None, suffix_bound=None):
+    """
+    Two-row score pass over already-encoded sequences.
+
+    With `min_score` and `suffix_bound` (an upper bound on the score obtainable
+    from rows i.. onwards, length m + 1), the pass is abandoned as soon as the
+    best reachable score falls below `min_score`.
+
+    Returns:
+        tuple: (best score, (i, j) best cell), or (None, None) if abandoned.
+    """
+    gap = effective_gap(weights)
+    row = np.zeros(len(candidate_ids) + 1)
+    best_score = 0
+    best_pos = (0, 0)
+
+    for i in range(1, len(target_ids) + 1):
+        row, _, _ = fill_row(
+            row, row_scores_for(i - 1, target_ids, candidate_ids, target_match, weights), gap)
+        j = int(np.argmax(row))
+        if row[j] > best_score:
+            best_score = row[j]
+            best_pos = (i, j)
+
+        # Any later alignment either extends a cell of this row or starts below it
+        if min_score is not None and i % ABORT_CHECK_EVERY == 0:
+            if max(best_score, row[j] + suffix_bound[i]) < min_score:
+                return None, None
+
+    return best_score, best_pos
+
+
+def score_block(target_ids, candidate_ids, target_match, top_row, left_col, weights=WILKERSON_WEIGHTS):
+    """
+    Score-only pass over one rectangular block of the matrix, given the scores
+    along its top and left boundaries. Blocks can be chained across column strips
+    and row bands to reproduce the full matrix exactly.
+
+    Args:
+        target_ids (np.ndarray): Target ids for the block's rows (length h).
+        candidate_ids (np.ndarray): Candidate ids for the block's columns (length w).
+        target_match (np.ndarray): Match weights for the block's rows.
+        top_row (np.ndarray): Scores of the row above the block, starting one
+            column left of it (length w + 1).
+        left_col (np.ndarray): Scores of the column left of the block, one per
+            block row (length h).
+        weights (dict): Smith-Waterman scoring parameters.
+
+    Returns:
+        tuple: (bottom_row, right_col, best_score, (r, c)), where bottom_row has the
+        same layout as top_row, right_col the same as left_col, and (r, c) is the
+        1-based block-local position of the first best cell in row-major order.
+    """
+    gap = effective_gap(weights)
+    ramp = gap * np.arange(1, len(candidate_ids) + 1)
+    prev = np.asarray(top_row, dtype=np.float64)
+    right_col = np.zeros(len(target_ids))
+    best_score = 0
+    best_pos = (0, 0)
+
+    for r in range(len(target_ids)):
+        row_scores = np.where(candidate_ids == target_ids[r], target_match[r], weights["mismatch"])
+        best = np.maximum(np.maximum(prev[:-1] + row_scores, prev[1:] + gap), 0)
+        row = np.empty_like(prev)
+        row[0] = left_col[r]
+        row[1:] = np.maximum(best, np.maximum(np.maximum.accumulate(best - ramp), left_col[r]) + ramp)
+        right_col[r] = row[-1]
+
+        c = int(np.argmax(row[1:]))
+        if row[c + 1] > best_score:
+            best_score = row[c + 1]
+            best_pos = (r + 1, c + 1)
+        prev = row
+
+    return prev, right_col, best_score, best_pos
+
+
+def smith_waterman_traceback(target, candidate, end, weights=WILKERSON_WEIGHTS, checkpoint_every=None):
+    """
+    Recover the aligned strings for an alignment ending at `end`.
+
+    Cells after `end` can't influence the path, so only the window of rows 0..i
+    and columns 0..j is recomputed. The forward pass keeps a checkpoint row every
+    `checkpoint_every` rows (default sqrt(i)); the traceback then recomputes one
+    block of rows at a time from its checkpoint, bottom to top, and stops as soon
+    as the path reaches a zero. Peak memory is O((i / k + k) * j) instead of O(m * n),
+    and the output is identical to `smith_waterman`.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+        end (tuple): (i, j) end cell, as returned by `smith_waterman_score`.
+        weights (dict): Smith-Waterman scoring parameters.
+        checkpoint_every (int, optional): Rows per recomputed block.
+
+    Returns:
+        dict: { "score": float, "aligned_target": str, "aligned_candidate": str }
+    """
+    end_i, end_j = end
+    if end_i == 0 or end_j == 0:
+        return {"score": 0, "aligned_target": "", "aligned_candidate": ""}
+
+    target, candidate = target[:end_i], candidate[:end_j]
+    target_ids, candidate_ids, target_match = compile_scoring(target, candidate, weights)
+    gap = effective_gap(weights)
+    block = checkpoint_every or max(1, int(np.sqrt(end_i)))
+
+    # Forward pass over the window, keeping every `block`-th row
+    checkpoints = {0: np.zeros(end_j + 1)}
+    row = checkpoints[0]
+    for i in range(1, end_i + 1):
+        row, _, _ = fill_row(
+            row, row_scores_for(i - 1, target_ids, candidate_ids, target_match, weights), gap)
+        if i % block == 0:
+            checkpoints[i] = row
+    score = row[end_j]
+
+    aligned_target = []
+    aligned_candidate = []
+    i, j = end_i, end_j
+
+    while i > 0 and j > 0:
+        # Recompute rows (lo, i] from the checkpoint at lo
+        lo = ((i - 1) // block) * block
+        rows = [checkpoints[lo]]
+        directions = [None]
+        for r in range(lo + 1, i + 1):
+            row, diag, up = fill_row(
+                rows[-1], row_scores_for(r - 1, target_ids, candidate_ids, target_match, weights), gap)
+            rows.append(row)
+            directions.append(traceback_row(row, diag, up, gap))
+
+        while i > lo and j > 0 and rows[i - lo][j] > 0:
+            direction = directions[i - lo][j]
+            if direction == 1:  # Diagonal (match/mismatch)
+                aligned_target.append(target[i - 1])
+                aligned_candidate.append(candidate[j - 1])
+                i -= 1
+                j -= 1
+            elif direction == 2:  # Up (gap in candidate)
+                aligned_target.append(target[i - 1])
+                aligned_candidate.append("-")
+                i -= 1
+            elif direction == 3:  # Left (gap in target)
+                aligned_target.append("-")
+                aligned_candidate.append(candidate[j - 1])
+                j -= 1
+            else:
+                break
+
+        # Path hit a zero inside this block
+        if i > lo:
+            break
+
+    return {
+        "score": score,
+        "aligned_target": " ".join(reversed(aligned_target)),
+        "aligned_candidate": " ".join(reversed(aligned_candidate)),
+    }
+
+
+def smith_waterman_linear(target, candidate, weights=WILKERSON_WEIGHTS):
+    """
+    Linear-memory Smith-Waterman: a score-only pass, then a checkpointed traceback
+    from the best cell. Same output as `smith_waterman`.
+    """
+    scored = smith_waterman_score(target, candidate, weights)
+    result = smith_waterman_traceback(target, candidate, scored["end"], weights)
+    result["score"] = scored["score"]
+    return result
+
+
+def find_seeds(target, candidate, k=3, max_occurrences=64):
+    """
+    Find exact shared token k-grams between two sequences.
+
+    The shorter sequence is indexed and the longer one scanned. k-grams that occur
+    more than `max_occurrences` times in either sequence (boilerplate like
+    "MASK_ENUM secretary shall") are skipped so that repeats can't blow up the
+    seed count.
+
+    Returns:
+        list of tuple: (i, j) start offsets, target[i:i+k] == candidate[j:j+k].
+    """
+    swap = len(target) > len(candidate)
+    short, long_ = (candidate, target) if swap else (target, candidate)
+
+    kgram_positions = {}
+    for i in range(len(short) - k + 1):
+        kgram_positions.setdefault(tuple(short[i:i + k]), []).append(i)
+
+    long_positions = {}
+    for j in range(len(long_) - k + 1):
+        kgram = tuple(long_[j:j + k])
+        if kgram in kgram_positions:
+            long_positions.setdefault(kgram, []).append(j)
+
+    seeds = []
+    for kgram, js in long_positions.items():
+        is_ = kgram_positions[kgram]
+        if len(is_) > max_occurrences or len(js) > max_occurrences:
+            continue
+        for i in is_:
+            for j in js:
+                seeds.append((j, i) if swap else (i, j))
+    return seeds
+
+
+def cluster_seeds(seeds, k, band, pad):
+    """
+    Group seeds into windows: seeds on nearby diagonals (within `band`) whose rows
+    are no more than 2 * `pad` apart share a window.
+
+    Returns:
+        list of tuple: (row_lo, row_hi, diag_lo, diag_hi), with rows as 0-based
+        token offsets and diagonals as j - i.
+    """
+    clusters = []
+    for i, j in sorted(seeds, key=lambda seed: (seed[1] - seed[0], seed[0])):
+        diag = j - i
+        merged = False
+        for cluster in reversed(clusters):
+            # Seeds come in diagonal order, so no earlier cluster is within band either
+            if diag - cluster[3] > band:
+                break
+            if cluster[0] - 2 * pad <= i <= cluster[1] + 2 * pad:
+                cluster[0] = min(cluster[0], i)
+                cluster[1] = max(cluster[1], i + k)
+                cluster[3] = max(cluster[3], diag)
+                merged = True
+                break
+        if not merged:
+            clusters.append([i, i + k, diag, diag])
+    return [tuple(cluster) for cluster in clusters]
+
+
+def banded_score(target_ids, candidate_ids, target_match, weights, row_lo, row_hi, diag_lo, diag_hi):
+    """
+    Score-only Smith-Waterman restricted to rows (row_lo, row_hi] and the diagonal
+    band diag_lo <= j - i <= diag_hi. Rows are stored by diagonal offset, so the
+    diagonal neighbour sits at the same index and the upper one at index + 1.
+
+    Returns:
+        tuple: (score, (i, j)) for the best cell inside the band.
+    """
+    n = len(candidate_ids)
+    gap = effective_gap(weights)
+    offsets = np.arange(diag_lo, diag_hi + 1)
+    ramp = gap * np.arange(1, len(offsets) + 1)
+
+    prev = np.zeros(len(offsets))
+    best_score = 0
+    best_pos = (0, 0)
+
+    for i in range(row_lo + 1, row_hi + 1):
+        j = i + offsets
+        valid = (j >= 1) & (j <= n)
+        row_scores = np.where(
+            candidate_ids[np.clip(j - 1, 0, n - 1)] == target_ids[i - 1],
+            target_match[i - 1], weights["mismatch"])
+
+        diag = prev + row_scores
+        up = np.append(prev[1:], 0) + gap
+        best = np.where(valid, np.maximum(np.maximum(diag, up), 0), 0)
+        row = np.maximum(best, np.maximum.accumulate(best - ramp) + ramp)
+        row[~valid] = 0
+
+        cell = int(np.argmax(row))
+        if row[cell] > best_score:
+            best_score = row[cell]
+            best_pos = (i, int(j[cell]))
+        prev = row
+
+    return best_score, best_pos
+
+
+def smith_waterman_seeded(target, candidate, weights=WILKERSON_WEIGHTS, k=3, band=16, pad=48):
+    """
+    Seed-and-extend Smith-Waterman for long-vs-short pairs.
+
+    Shared token k-grams are used as seeds, grouped into windows, and each window
+    is scored with banded Smith-Waterman (band of +/- `band` diagonals around its
+    seeds, `pad` extra rows on either side). The best window is then aligned
+    exactly over its bounding box. Scores never exceed the exhaustive score; when
+    there are no seeds, or the windows would cost about as much as the full
+    matrix, this falls back to `smith_waterman_linear`.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+        weights (dict): Smith-Waterman scoring parameters.
+        k (int): Seed length, in tokens.
+        band (int): Diagonals scored on either side of a window's seeds.
+        pad (int): Rows scored before and after a window's seeds.
+
+    Returns:
+        dict: { "score": int, "aligned_target": str, "aligned_candidate": str }
+    """
+    m, n = len(target), len(candidate)
+    seeds = find_seeds(target, candidate, k)
+    if not seeds:
+        return smith_waterman_linear(target, candidate, weights)
+
+    windows = []
+    for row_lo, row_hi, diag_lo, diag_hi in cluster_seeds(seeds, k, band, pad):
+        row_lo, row_hi = max(0, row_lo - pad), min(m, row_hi + pad)
+        diag_lo = max(diag_lo - band, -row_hi)
+        diag_hi = min(diag_hi + band, n - row_lo)
+        windows.append((row_lo, row_hi, diag_lo, diag_hi))
+
+    cost = sum((row_hi - row_lo) * (diag_hi - diag_lo + 1)
+               for row_lo, row_hi, diag_lo, diag_hi in windows)
+    if cost >= m * n:
+        return smith_waterman_linear(target, candidate, weights)
+
+    target_ids, candidate_ids, target_match = compile_scoring(target, candidate, weights)
+
+    best_score = 0
+    best_window = None
+    for window in windows:
+        score, _ = banded_score(
+            target_ids, candidate_ids, target_match, weights, *window)
+        if score > best_score:
+            best_score = score
+            best_window = window
+
+    if best_window is None:
+        return {"score": 0, "aligned_target": "", "aligned_candidate": ""}
+
+    # Exact alignment over the best window's bounding box
+    row_lo, row_hi, diag_lo, diag_hi = best_window
+    col_lo, col_hi = max(0, row_lo + diag_lo), min(n, row_hi + diag_hi)
+    return smith_waterman_linear(
+        target[row_lo:row_hi], candidate[col_lo:col_hi], weights)
+
+
+def build_query_profile(query_tokens, weights=WILKERSON_WEIGHTS):
+    """
+    Precompute the query side of an alignment once, so it can be reused across
+    many candidates: a token -> id vocabulary, the query's id array, the per-token
+    match weights (with every enabled bonus rule), and per-id counts and match
+    weights for score upper bounds.
+
+    Returns:
+        dict: { "tokens", "vocab", "ids", "match", "counts", "id_match" }
+    """
+    vocab = {}
+    ids = np.fromiter(
+        (vocab.setdefault(token, len(vocab)) for token in query_tokens),
+        dtype=np.int64, count=len(query_tokens))
+    id_match = match_weights(list(vocab), weights)
+    match = id_match[ids]
+    return {
+        "tokens": query_tokens,
+        "vocab": vocab,
+        "ids": ids,
+        "match": match,
+        "counts": np.bincount(ids, minlength=len(vocab)),
+        "id_match": id_match,
+    }
+
+
+def encode_with_profile(profile, tokens):
+    """
+    Encode candidate tokens against a query profile. Tokens that don't occur in the
+    query can never match, so they all share id -1.
+    """
+    vocab = profile["vocab"]
+    return np.fromiter((vocab.get(token, -1) for token in tokens), dtype=np.int64, count=len(tokens))
+
+
+def candidate_counts(profile, candidate_ids):
+    """
+    Occurrences of each query vocabulary id in an encoded candidate.
+    """
+    return np.bincount(candidate_ids[candidate_ids >= 0], minlength=len(profile["vocab"]))
+
+
+def score_upper_bound(profile, counts):
+    """
+    Upper bound on the local alignment score against a candidate.
+
+    Gaps and mismatches only subtract, and each token can be matched at most
+    min(query count, candidate count) times, so the shared token multiset weighted
+    by the `enhanced_match_score` rules bounds the score from above.
+    """
+    return float(np.minimum(profile["counts"], counts) @ profile["id_match"])
+
+
+def suffix_upper_bound(profile, counts):
+    """
+    suffix[i] bounds the score gained from query rows i + 1.. onwards: the sum of
+    match weights of the remaining query tokens that occur in the candidate.
+    """
+    gains = profile["match"] * (counts[profile["ids"]] > 0)
+    suffix = np.zeros(len(gains) + 1)
+    suffix[:-1] = np.cumsum(gains[::-1])[::-1]
+    return suffix
+
+
+def align_many(query_tokens, candidate_token_lists, top_n=10, weights=WILKERSON_WEIGHTS, prune=True, stats=None,
+               cache=None):
+    """
+    Align one query against many candidates, keeping only the best `top_n`.
+
+    The query profile is built once, each candidate is streamed through a
+    score-only pass, and a bounded min-heap keeps the current top n. Only the
+    survivors get a traceback.
+
+    With `prune`, candidates are visited in decreasing order of their score upper
+    bound. Once the heap is full, a candidate whose bound can't beat the heap's
+    minimum is skipped, and a score pass is abandoned once it can't either. The
+    results are the same as without pruning.
+
+    With a `cache`, cached scores replace the score pass, and every completed
+    score pass and traceback is written back, committed once at the end.
+
+    Args:
+        query_tokens (list of str): Tokenized query (target) sequence.
+        candidate_token_lists (iterable of list of str): Tokenized candidates.
+        top_n (int): Number of alignments to keep.
+        weights (dict): Smith-Waterman scoring parameters.
+        prune (bool): Skip and abandon candidates that can't make the top n.
+        stats (dict, optional): Filled with "candidates", "pruned", "aborted",
+            "aligned" and "cached" counts.
+        cache (AlignmentCache, optional): Persistent alignment cache.
+
+    Returns:
+        list of dict: { "index", "score", "aligned_target", "aligned_candidate" },
+        ranked by score (ties by candidate index), where index is the candidate's
+        position in `candidate_token_lists`.
+    """
+    counters = {"candidates": 0, "pruned": 0, "aborted": 0, "aligned": 0, "cached": 0}
+    if stats is not None:
+        stats.update(counters)
+    if top_n <= 0:
+        return []
+
+    profile = build_query_profile(query_tokens, weights)
+    encoded = [(index, candidate, encode_with_profile(profile, candidate))
+               for index, candidate in enumerate(candidate_token_lists)]
+    counters["candidates"] = len(encoded)
+
+    bounds = {}
+    if prune:
+        for index, _, candidate_ids in encoded:
+            bounds[index] = candidate_counts(profile, candidate_ids)
+        encoded.sort(key=lambda e: (-score_upper_bound(profile, bounds[e[0]]), e[0]))
+
+    heap = []  # (score, -index, end, tokens), smallest score on top
+    cached_alignments = {}
+
+    for index, candidate, candidate_ids in encoded:
+        cached = cache.get(query_tokens, candidate, weights=weights) if cache is not None else None
+        if cached is not None:
+            counters["cached"] += 1
+            if cached["aligned_target"] is not None:
+                cached_alignments[index] = cached
+            entry = (cached["score"], -index, tuple(cached["end"]), candidate)
+            if len(heap) < top_n:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+            continue
+
+        min_score = None
+        if prune and len(heap) == top_n:
+            # Ties are broken by index, so a later candidate must strictly beat the minimum
+            floor_score, floor_neg_index = heap[0][:2]
+            upper = score_upper_bound(profile, bounds[index])
+            if (upper, -index) <= (floor_score, floor_neg_index):
+                counters["pruned"] += 1
+                continue
+            min_score = floor_score if index < -floor_neg_index else np.nextafter(floor_score, np.inf)
+
+        if len(query_tokens) == 0 or len(candidate) == 0:
+            score, end = 0, (0, 0)
+        elif min_score is None:
+            score, end = score_encoded(profile["ids"], candidate_ids, profile["match"], weights)
+        else:
+            score, end = score_encoded(
+                profile["ids"], candidate_ids, profile["match"], weights,
+                min_score, suffix_upper_bound(profile, bounds[index]))
+            if score is None:
+                counters["aborted"] += 1
+                continue
+        counters["aligned"] += 1
+        if cache is not None:
+            cache.put(query_tokens, candidate, {"score": score, "end": end}, weights=weights)
+
+        entry = (score, -index, end, candidate)
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    if stats is not None:
+        stats.update(counters)
+
+    results = []
+    for score, neg_index, end, candidate in sorted(heap, key=lambda e: e[:2], reverse=True):
+        if -neg_index in cached_alignments:
+            aligned = cached_alignments[-neg_index]
+        else:
+            aligned = smith_waterman_traceback(query_tokens, candidate, end, weights)
+            if cache is not None:
+                cache.put(query_tokens, candidate, {**aligned, "score": score, "end": end}, weights=weights)
+        results.append({
+            "index": -neg_index,
+            "score": score,
+            "aligned_target": aligned["aligned_target"],
+            "aligned_candidate": aligned["aligned_candidate"],
+        })
+    if cache is not None:
+        cache.flush()
+    return results
+
+
+def fill_row_masked(prev_row, row_scores, gap, lo, left, col_mask, hi=None):
+    """
+    Recompute columns lo..hi - 1 of one row, treating masked columns as forced zeros.
+
+    Args:
+        prev_row (np.ndarray): Row i - 1 of the score matrix, length n + 1.
+        row_scores (np.ndarray): Match/mismatch scores for columns lo..hi - 1.
+        gap (float): Effective gap penalty.
+        lo (int): First column to recompute (>= 1).
+        left (float): Current score in column lo - 1 of this row.
+        col_mask (np.ndarray): Boolean mask over columns 0..n.
+        hi (int, optional): Column after the last one to recompute, n + 1 by default.
+
+    Returns:
+        np.ndarray: New scores for columns lo..hi - 1.
+    """
+    hi = len(prev_row) if hi is None else hi
+    diag = prev_row[lo - 1:hi - 1] + row_scores
+    up = prev_row[lo:hi] + gap
+    best = np.maximum(np.maximum(diag, up), 0)
+
+    # Left-gap running max, restarted after every masked run
+    out = np.zeros_like(best)
+    unmasked = np.concatenate(([0], ~col_mask[lo:hi], [0])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(unmasked))
+    for start, stop in zip(edges[::2], edges[1::2]):
+        carry = left if start == 0 else 0
+        ramp = gap * np.arange(1, stop - start + 1)
+        out[start:stop] = np.maximum(best[start:stop], np.maximum(
+            np.maximum.accumulate(best[start:stop] - ramp), carry) + ramp)
+    return out
+
+
+def smith_waterman_top_k(target, candidate, k=3, weights=WILKERSON_WEIGHTS):
+    """
+    Up to k non-overlapping local alignments, in the style of Waterman-Eggert.
+
+    After each alignment is extracted, the target rows and candidate columns it
+    spans are masked to zero and only the affected cells are recomputed: in each
+    row, the masked columns and the columns that changed in the row above, then
+    rightwards only while left-gap moves keep changing cells. The first region is
+    the alignment `smith_waterman` returns; later regions never share a target or
+    candidate token with earlier ones.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+        k (int): Maximum number of regions.
+        weights (dict): Smith-Waterman scoring parameters.
+
+    Returns:
+        list of dict: { "score", "target_start", "target_end", "candidate_start",
+        "candidate_end", "aligned_target", "aligned_candidate" }, in extraction
+        order (non-increasing score). Offsets are token positions, end exclusive.
+    """
+    m, n = len(target), len(candidate)
+    if m == 0 or n == 0:
+        return []
+
+    target_ids, candidate_ids, target_match = compile_scoring(target, candidate, weights)
+    gap = effective_gap(weights)
+
+    score_matrix = np.zeros((m + 1, n + 1))
+    for i in range(1, m + 1):
+        score_matrix[i], _, _ = fill_row(
+            score_matrix[i - 1],
+            row_scores_for(i - 1, target_ids, candidate_ids, target_match, weights), gap)
+
+    row_mask = np.zeros(m + 1, dtype=bool)
+    col_mask = np.zeros(n + 1, dtype=bool)
+    regions = []
+
+    while len(regions) < k:
+        end_i, end_j = np.unravel_index(int(np.argmax(score_matrix)), score_matrix.shape)
+        score = score_matrix[end_i, end_j]
+        if score <= 0:
+            break
+
+        # Traceback, recovering directions from the scores themselves
+        aligned_target = []
+        aligned_candidate = []
+        i, j = end_i, end_j
+        while i > 0 and j > 0 and score_matrix[i, j] > 0:
+            cell = score_matrix[i, j]
+            pair_score = target_match[i - 1] if target_ids[i - 1] == candidate_ids[j - 1] else weights["mismatch"]
+            if np.isclose(cell, score_matrix[i - 1, j - 1] + pair_score):
+                aligned_target.append(target[i - 1])
+                aligned_candidate.append(candidate[j - 1])
+                i -= 1
+                j -= 1
+            elif np.isclose(cell, score_matrix[i - 1, j] + gap):
+                aligned_target.append(target[i - 1])
+                aligned_candidate.append("-")
+                i -= 1
+            else:
+                aligned_target.append("-")
+                aligned_candidate.append(candidate[j - 1])
+                j -= 1
+
+        regions.append({
+            "score": score,
+            "target_start": int(i),
+            "target_end": int(end_i),
+            "candidate_start": int(j),
+            "candidate_end": int(end_j),
+            "aligned_target": " ".join(reversed(aligned_target)),
+            "aligned_candidate": " ".join(reversed(aligned_candidate)),
+        })
+        if len(regions) == k:
+            break
+
+        # Mask the region's rows and columns, then recompute what they affect
+        first_row, first_col = i + 1, j + 1
+        row_mask[first_row:end_i + 1] = True
+        col_mask[first_col:end_j + 1] = True
+
+        # Columns [changed_lo, changed_hi) of the previous row that changed, if any
+        changed_lo = changed_hi = None
+        for r in range(1, m + 1):
+            if row_mask[r]:
+                nonzero = np.flatnonzero(score_matrix[r])
+                changed_lo, changed_hi = (int(nonzero[0]), int(nonzero[-1]) + 1) if len(nonzero) else (None, None)
+                score_matrix[r] = 0
+                continue
+
+            # Newly masked columns change every row that scored in them, and a
+            # change in the row above reaches the cell below it and the one to its right
+            if changed_lo is None and not score_matrix[r, first_col:end_j + 1].any():
+                continue
+            lo, hi = first_col, end_j + 1
+            if changed_lo is not None:
+                lo, hi = min(lo, changed_lo), min(max(hi, changed_hi + 1), n + 1)
+            changed_lo = changed_hi = None
+            left = score_matrix[r, lo - 1]
+            while True:
+                new = fill_row_masked(
+                    score_matrix[r - 1],
+                    row_scores_for(r - 1, target_ids, candidate_ids[lo - 1:hi - 1], target_match, weights),
+                    gap, lo, left, col_mask, hi)
+                changed = np.flatnonzero(new != score_matrix[r, lo:hi])
+                score_matrix[r, lo:hi] = new
+                if len(changed):
+                    changed_lo = lo + int(changed[0]) if changed_lo is None else changed_lo
+                    changed_hi = lo + int(changed[-1]) + 1
+                # Past this range only the left neighbour differs, so once a
+                # cell comes out unchanged the rest of the row does too
+                if hi > n or not len(changed) or changed[-1] != hi - lo - 1:
+                    break
+                left = new[-1]
+                lo, hi = hi, min(hi + 2 * (hi - lo), n + 1)
+
+    return regions
+
+
+# Selectable alignment engines, all returning the same payload
+SW_ENGINES = {
+    "python": smith_waterman,
+    "numpy": smith_waterman_numpy,
+    "linear": smith_waterman_linear,
+    "seeded": smith_waterman_seeded,
+}
+
+# Engines guaranteed to produce identical results, so they can share cache entries
+EXACT_ENGINES = {"python", "numpy", "linear"}
+
+
+def alignment_offsets(end, aligned_target, aligned_candidate):
+    """
+    Token offsets of an alignment ending at `end`, recovered from its aligned strings.
+
+    Returns:
+        dict: { "target_start", "target_end", "candidate_start", "candidate_end" }
+    """
+    end_i, end_j = end
+    target_len = sum(token != "-" for token in aligned_target.split())
+    candidate_len = sum(token != "-" for token in aligned_candidate.split())
+    return {
+        "target_start": int(end_i) - target_len,
+        "target_end": int(end_i),
+        "candidate_start": int(end_j) - candidate_len,
+        "candidate_end": int(end_j),
+    }
+
+
+def align(target, candidate, engine="numpy", cache=None):
+    """
+    Align two token sequences with the selected Smith-Waterman engine.
+
+    Args:
+        target (list of str): Tokenized reference sequence.
+        candidate (list of str): Tokenized sequence to compare.
+        engine (str): Key into `SW_ENGINES`.
+        cache (AlignmentCache, optional): Checked before computing, and filled
+            on a miss.
+
+    Returns:
+        dict: { "score": int, "aligned_target": str, "aligned_candidate": str }
+    """
+    if engine not in SW_ENGINES:
+        raise ValueError(f"Unknown alignment engine: {engine}")
+    if cache is None:
+        return SW_ENGINES[engine](target, candidate)
+
+    method = "exact" if engine in EXACT_ENGINES else engine
+    cached = cache.get(target, candidate, method)
+    if cached is not None and cached["aligned_target"] is not None:
+        cache.flush()
+        return {key: cached[key] for key in ("score", "aligned_target", "aligned_candidate")}
+
+    if cached is not None and method == "exact":
+        # Score-only entry: skip straight to the traceback
+        result = smith_waterman_traceback(target, candidate, cached["end"])
+        result["score"] = cached["score"]
+        end = cached["end"]
+    elif method == "exact":
+        scored = smith_waterman_score(target, candidate)
+        result = smith_waterman_traceback(target, candidate, scored["end"])
+        result["score"] = scored["score"]
+        end = scored["end"]
+    else:
+        result = SW_ENGINES[engine](target, candidate)
+        end = None
+
+    cache.put(target, candidate, {**result, "end": end}, method)
+    cache.flush()
+    return result
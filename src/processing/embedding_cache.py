@@ -0,0 +1,119 @@
+"""
+Persistent cache of text embeddings, keyed by content hash.
+
+Section texts repeat across runs and bill versions, so each distinct text is
+embedded once. Vectors are appended to one raw float16/float32 matrix file that
+is memory-mapped for reads, and their SHA-256 keys to a text file, one per
+line, in the same order. Vectors are written before keys, so a crash mid-write
+leaves at worst an unreferenced row.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Append-only embedding cache for one model, in a directory with
+    meta.json, keys.txt and vectors.bin.
+    """
+
+    def __init__(self, path, model_name, dim=384, dtype="float16"):
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        meta = {"model_name": model_name, "dim": dim, "dtype": self.dtype.name}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(f"Embedding cache at {path} was built with {existing}, not {meta}")
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        self.keys_path = os.path.join(path, "keys.txt")
+        self.vectors_path = os.path.join(path, "vectors.bin")
+        self.index = {}
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, encoding="utf-8") as f:
+                for row, line in enumerate(f):
+                    self.index[line.rstrip("\n")] = row
+        self.remap()
+
+    def remap(self):
+        """
+        Re-open the vector file after appends. Rows without a key are ignored.
+        """
+        row_bytes = self.dim * self.dtype.itemsize
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        rows = min(len(self.index), size // row_bytes)
+        self.vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim)) \
+            if rows else np.zeros((0, self.dim), dtype=self.dtype)
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def get_many(self, texts):
+        """
+        Look up many texts at once.
+
+        Returns:
+            tuple: (float32 vectors of shape (len(texts), dim), with zeros for
+            misses, and a boolean mask of which texts were found)
+        """
+        rows = np.array([self.index.get(self.key(text), -1) for text in texts], dtype=np.int64)
+        found = (rows >= 0) & (rows < len(self.vectors))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        vectors[found] = self.vectors[rows[found]]
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+        return vectors, found
+
+    def put_many(self, texts, vectors):
+        """
+        Append vectors for texts not already cached.
+        """
+        keys, rows, seen = [], [], set()
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            if key not in self.index and key not in seen:
+                seen.add(key)
+                keys.append(key)
+                rows.append(vector)
+        if not keys:
+            return
+
+        # Truncate rows left behind by an interrupted write, then append
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(len(self.vectors) * self.dim * self.dtype.itemsize)
+            f.write(np.asarray(rows, dtype=self.dtype).tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+        for key in keys:
+            self.index[key] = len(self.index)
+        self.remap()
+
+    def stats(self):
+        """
+        Hit and miss counters, plus the number of cached vectors.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0,
+            "entries": len(self.vectors),
+        }
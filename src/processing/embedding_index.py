@@ -0,0 +1,165 @@
+"""
+Approximate nearest-neighbour search over normalized section embeddings.
+
+An inverted-file (IVF) index: spherical k-means splits the embedding matrix
+into `n_lists` clusters, and vectors are stored grouped by cluster. A query is
+scored against the centroids first and then only against the vectors of its
+`n_probe` closest clusters, so `n_probe` trades recall for latency. Scores are
+dot products, which equal cosine similarity for the normalized vectors that
+`src.encode` produces.
+"""
+
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+from src.processing.top_k import top_k_rows
+
+# Vectors scored per block in exact search and k-means assignment
+BLOCK_SIZE = 8192
+
+
+def exact_search(vectors, queries, k=10):
+    """
+    Brute-force top-k dot-product search, in blocks of corpus rows.
+
+    Returns:
+        tuple: (ids, scores), both of shape (len(queries), k)
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    best_ids = np.full((len(queries), 0), -1, dtype=np.int64)
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(vectors), BLOCK_SIZE):
+        block = np.asarray(vectors[start:start + BLOCK_SIZE], dtype=np.float32) @ queries.T
+        ids = np.hstack([best_ids, np.broadcast_to(
+            np.arange(start, start + block.shape[0]), (len(queries), block.shape[0]))])
+        top, best_scores = top_k_rows(np.hstack([best_scores, block.T]), k)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids, best_scores
+
+
+def assign(vectors, centroids):
+    """
+    Index of the closest (highest dot product) centroid for every vector.
+    """
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), BLOCK_SIZE):
+        labels[start:start + BLOCK_SIZE] = np.argmax(
+            vectors[start:start + BLOCK_SIZE] @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """
+    k-means on the unit sphere: centroids are re-normalized means, and
+    assignment is by dot product. Empty clusters are re-seeded from random
+    vectors.
+
+    Returns:
+        np.ndarray: float32 centroids of shape (n_clusters, dim)
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(vectors, centroids)
+        members = sparse.csr_matrix(
+            (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+            shape=(n_clusters, len(labels)))
+        sums = np.asarray(members @ vectors, dtype=np.float32)
+        empty = ~np.bincount(labels, minlength=n_clusters).astype(bool)
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class IVFIndex:
+    """
+    IVF index over an embedding matrix. Vector ids are row positions in the
+    matrix passed to `build`.
+    """
+
+    def __init__(self, centroids, vectors, ids, offsets, n_probe=8):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_probe=8, train_size=None, iterations=10, seed=0):
+        """
+        Cluster and group an embedding matrix.
+
+        Args:
+            vectors: (N x dim) normalized embeddings.
+            n_lists: Number of clusters, default about 4 x sqrt(N).
+            n_probe: Default number of clusters scanned per query.
+            train_size: k-means runs on a random sample of at most this many
+                vectors, default 32 per cluster; all vectors are then assigned.
+            iterations: k-means iterations.
+            seed: Random seed for sampling and initialization.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_lists = min(n_lists or max(1, int(4 * np.sqrt(len(vectors)))), len(vectors))
+        train_size = min(train_size or 32 * n_lists, len(vectors))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), train_size, replace=False)]
+        centroids = spherical_kmeans(sample, n_lists, iterations, seed)
+
+        labels = assign(vectors, centroids)
+        ids = np.argsort(labels, kind='stable')
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+        return cls(centroids, vectors[ids], ids, offsets, n_probe)
+
+    def search(self, queries, k=10, n_probe=None):
+        """
+        Approximate top-k dot-product search for a batch of queries. Queries
+        probing the same cluster are scored against it in one matrix product.
+
+        Returns:
+            tuple: (ids, scores), both of shape (len(queries), k); rows are
+            padded with id -1 if the probed clusters hold fewer than k vectors
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        probes, _ = top_k_rows(queries @ self.centroids.T, n_probe)
+
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        flat = probes.ravel()
+        order = np.argsort(flat, kind='stable')
+        lists, starts = np.unique(flat[order], return_index=True)
+        for cluster, group in zip(lists, np.split(order // n_probe, starts[1:])):
+            lo, hi = self.offsets[cluster], self.offsets[cluster + 1]
+            if lo == hi:
+                continue
+            block = queries[group] @ self.vectors[lo:hi].T
+            ids = np.hstack([best_ids[group], np.broadcast_to(self.ids[lo:hi], block.shape)])
+            top, best_scores[group] = top_k_rows(np.hstack([best_scores[group], block]), k)
+            best_ids[group] = np.take_along_axis(ids, top, axis=1)
+        return best_ids, best_scores
+
+    def save(self, path):
+        """
+        Write the index as .npy arrays plus a meta.json in a directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ("centroids", "vectors", "ids", "offsets"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"n_probe": self.n_probe}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open an index written by `save`, memory-mapped by default.
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in ("centroids", "vectors", "ids", "offsets")}
+        return cls(n_probe=meta["n_probe"], **arrays)
@@ -0,0 +1,165 @@
+"""
+Array-backed index structures: inverted postings and MinHash LSH band tables
+held as flat NumPy arrays, so they can be written to disk and memory-mapped
+instead of rebuilt as Python dicts in every process.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+
+from src.processing.minhash_signatures import FNV_PRIME
+
+
+def encode_strings(strings):
+    """
+    Pack strings into one utf-8 byte array plus offsets.
+
+    Returns:
+        tuple: (blob uint8 array, offsets int64 array of length len(strings) + 1)
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(blob, offsets):
+    """
+    Inverse of `encode_strings`.
+    """
+    data = np.asarray(blob).tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class FlatPostings(Mapping):
+    """
+    Read-only term -> postings mapping over flat arrays: postings of term i
+    are `postings[indptr[i]:indptr[i + 1]]`. Used to store the header
+    index postings in snapshots.
+    """
+
+    def __init__(self, terms, indptr, postings):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.postings = postings
+
+    @classmethod
+    def from_dict(cls, index):
+        """
+        Flatten a term -> list of section indices mapping.
+        """
+        terms = list(index)
+        lists = [np.asarray(index[term], dtype=np.int32) for term in terms]
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings) for postings in lists], out=indptr[1:])
+        postings = np.concatenate(lists) if lists else np.zeros(0, dtype=np.int32)
+        return cls(terms, indptr, postings)
+
+    def __getitem__(self, term):
+        i = self.term_ids[term]
+        return self.postings[self.indptr[i]:self.indptr[i + 1]]
+
+    def __contains__(self, term):
+        return term in self.term_ids
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def band_keys(signatures, hashranges):
+    """
+    One 64-bit key per LSH band of each signature.
+
+    Returns:
+        np.ndarray: uint64 array of shape (len(signatures), len(hashranges))
+    """
+    signatures = np.asarray(signatures, dtype=np.uint64)
+    keys = np.zeros((signatures.shape[0], len(hashranges)), dtype=np.uint64)
+    for band, (start, end) in enumerate(hashranges):
+        key = np.zeros(signatures.shape[0], dtype=np.uint64)
+        for column in range(start, end):
+            key = (key ^ signatures[:, column]) * FNV_PRIME
+        keys[:, band] = key ^ (key >> np.uint64(29))
+    return keys
+
+
+class BandedLSH:
+    """
+    MinHash LSH with each band table stored as sorted key and member arrays,
+    queried by binary search. Answers `query` like `datasketch.MinHashLSH`
+    (keys are str section indices); inserts after construction go to small
+    per-band dicts and removals to a tombstone set.
+    """
+
+    def __init__(self, hashranges, sorted_keys, members, num_perm):
+        self.hashranges = [tuple(band) for band in hashranges]
+        self.sorted_keys = sorted_keys
+        self.members = members
+        self.h = num_perm
+        self.b = len(self.hashranges)
+        self.inserted = [{} for _ in self.hashranges]
+        self.removed = set()
+
+    @classmethod
+    def from_signatures(cls, signatures, indices, hashranges):
+        """
+        Band tables for the signatures of the given section indices.
+        """
+        indices = np.asarray(indices, dtype=np.int32)
+        keys = band_keys(np.asarray(signatures)[indices], hashranges)
+        order = np.argsort(keys, axis=0, kind='stable')
+        sorted_keys = np.ascontiguousarray(np.take_along_axis(keys, order, axis=0).T)
+        members = np.ascontiguousarray(indices[order].T)
+        return cls(hashranges, sorted_keys, members, np.asarray(signatures).shape[1])
+
+    def query(self, minhash):
+        keys = band_keys(np.asarray(minhash.hashvalues)[None, :], self.hashranges)[0]
+        found = []
+        for band, key in enumerate(keys):
+            lo = np.searchsorted(self.sorted_keys[band], key, side='left')
+            hi = np.searchsorted(self.sorted_keys[band], key, side='right')
+            found.append(self.members[band][lo:hi])
+            found.append(np.asarray(self.inserted[band].get(int(key), []), dtype=np.int32))
+        candidates = np.unique(np.concatenate(found))
+        return [str(i) for i in candidates if int(i) not in self.removed]
+
+    def query_many(self, signatures):
+        """
+        Candidates for a batch of signatures, one binary search per band for
+        the whole batch.
+
+        Returns:
+            list of np.ndarray of section indices, sorted, one per signature
+        """
+        keys = band_keys(signatures, self.hashranges)
+        found = [[] for _ in range(len(keys))]
+        for band in range(self.b):
+            lo = np.searchsorted(self.sorted_keys[band], keys[:, band], side='left')
+            hi = np.searchsorted(self.sorted_keys[band], keys[:, band], side='right')
+            for query in np.flatnonzero(hi > lo):
+                found[query].append(self.members[band][lo[query]:hi[query]])
+            if self.inserted[band]:
+                for query, key in enumerate(keys[:, band]):
+                    found[query].append(np.asarray(self.inserted[band].get(int(key), []), dtype=np.int32))
+
+        results = []
+        for arrays in found:
+            candidates = np.unique(np.concatenate(arrays)) if arrays else np.zeros(0, dtype=np.int32)
+            if self.removed:
+                candidates = candidates[~np.isin(candidates, list(self.removed))]
+            results.append(candidates.astype(np.int64))
+        return results
+
+    def insert(self, key, minhash):
+        index = int(key)
+        self.removed.discard(index)
+        for band, band_key in enumerate(band_keys(np.asarray(minhash.hashvalues)[None, :], self.hashranges)[0]):
+            self.inserted[band].setdefault(int(band_key), []).append(index)
+
+    def remove(self, key):
+        self.removed.add(int(key))
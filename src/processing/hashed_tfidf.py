@@ -0,0 +1,111 @@
+"""
+TF-IDF over hashed term counts, so sections can be added and removed without
+refitting a vocabulary.
+
+Term counts come from a stateless `HashingVectorizer`, and document frequencies
+are kept as a running array. IDF weights are recomputed only on `refresh`
+(automatically once enough documents have changed); until then new rows are
+weighted with the previous IDF. Weighting otherwise mirrors
+`TfidfVectorizer(min_df=2, max_df=0.95)`: smoothed IDF and L2-normalized rows.
+"""
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class HashedTfidf:
+    """
+    Incrementally updatable TF-IDF. Rows of `matrix` are addressed by the same
+    stable indices as the `SectionStore`; removed rows are zeroed, not dropped.
+    """
+
+    def __init__(self, n_features=2**20, min_df=2, max_df=0.95, refresh_fraction=0.1):
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        self.n_features = n_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.refresh_fraction = refresh_fraction
+
+        self.counts = sparse.csr_matrix((0, n_features), dtype=np.float64)
+        self.matrix = sparse.csr_matrix((0, n_features), dtype=np.float64)
+        self.df = np.zeros(n_features, dtype=np.int64)
+        self.idf = np.zeros(n_features, dtype=np.float64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.num_docs = 0
+        self.changed = 0
+
+    @classmethod
+    def fit(cls, texts, **kwargs):
+        """
+        Build from an initial set of texts, with IDF computed over all of them.
+        """
+        tfidf = cls(**kwargs)
+        tfidf.add(texts)
+        tfidf.refresh()
+        return tfidf
+
+    def weigh(self, counts):
+        """
+        Apply the current IDF to raw counts and L2-normalize the rows.
+        """
+        return normalize(sparse.csr_matrix(counts.multiply(self.idf)))
+
+    def transform(self, texts):
+        """
+        TF-IDF rows for query texts, with the current IDF.
+        """
+        return self.weigh(self.hasher.transform(texts))
+
+    def add(self, texts):
+        """
+        Append rows for new texts. Returns True if this triggered a refresh.
+        """
+        counts = sparse.csr_matrix(self.hasher.transform(texts))
+        counts.sum_duplicates()
+        self.df += np.bincount(counts.indices, minlength=self.n_features)
+        self.counts = sparse.vstack([self.counts, counts], format='csr')
+        self.alive = np.concatenate([self.alive, np.ones(counts.shape[0], dtype=bool)])
+        self.num_docs += counts.shape[0]
+        self.changed += counts.shape[0]
+
+        if self.changed > self.refresh_fraction * self.num_docs:
+            self.refresh()
+            return True
+        self.matrix = sparse.vstack([self.matrix, self.weigh(counts)], format='csr')
+        return False
+
+    def remove(self, indices):
+        """
+        Zero the rows of removed texts and drop them from the document
+        frequencies. Returns True if this triggered a refresh.
+        """
+        for i in indices:
+            if not self.alive[i]:
+                continue
+            self.alive[i] = False
+            row = slice(self.counts.indptr[i], self.counts.indptr[i + 1])
+            self.df[self.counts.indices[row]] -= 1
+            self.counts.data[row] = 0
+            self.matrix.data[self.matrix.indptr[i]:self.matrix.indptr[i + 1]] = 0
+            self.num_docs -= 1
+            self.changed += 1
+
+        if self.changed > self.refresh_fraction * max(self.num_docs, 1):
+            self.refresh()
+            return True
+        return False
+
+    def refresh(self):
+        """
+        Recompute IDF from the current document frequencies and reweigh every
+        row. No re-tokenizing, just one pass over the stored counts.
+        """
+        n = self.num_docs
+        keep = (self.df >= self.min_df) & (self.df <= self.max_df * n)
+        idf = np.log((1 + n) / (1 + self.df)) + 1
+        self.idf = np.where(keep, idf, 0.0)
+        self.counts.eliminate_zeros()
+        self.matrix = self.weigh(self.counts)
+        self.changed = 0
@@ -0,0 +1,157 @@
+"""
+IDF-weighted inverted index over section header words.
+
+Postings are sorted int32 arrays of section indices. Stopwords are never
+indexed, and words found in more than `max_df` of all headers are skipped at
+query time, so a common word like "authority" no longer touches most of the
+corpus. Scores are accumulated only over the postings a query touches, and the
+top-k is taken with argpartition instead of sorting every touched section.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+
+# Function words that carry no signal in a header
+HEADER_STOPWORDS = frozenset({
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "into", "is", "of",
+    "on", "or", "the", "to", "under", "with",
+})
+
+
+class HeaderIndex(Mapping):
+    """
+    Header word -> sorted int32 postings, with IDF computed from the current
+    posting lengths. Updated in place by `add` and `remove`.
+    """
+
+    def __init__(self, postings=None, num_sections=0, max_df=0.5, stopwords=HEADER_STOPWORDS):
+        self.postings = dict(postings or {})
+        self.num_sections = num_sections
+        self.max_df = max_df
+        self.stopwords = frozenset(stopwords)
+
+    @classmethod
+    def build(cls, sections, **kwargs):
+        index = cls(**kwargs)
+        index.add(sections, range(len(sections)))
+        return index
+
+    def words(self, section):
+        """
+        Distinct indexable words of a section's normalized header.
+        """
+        return set(section.get('normalized_header', '').split()) - self.stopwords
+
+    def add(self, sections, indices):
+        """
+        Index sections under the given (increasing, previously unused) indices.
+        """
+        grouped = {}
+        for i, section in zip(indices, sections):
+            for word in self.words(section):
+                grouped.setdefault(word, []).append(int(i))
+        for word, new in grouped.items():
+            new = np.asarray(new, dtype=np.int32)
+            old = self.postings.get(word)
+            self.postings[word] = new if old is None else np.union1d(old, new).astype(np.int32)
+        self.num_sections += len(sections)
+
+    def remove(self, sections, indices):
+        """
+        Drop sections from the postings of their header words.
+        """
+        grouped = {}
+        for i, section in zip(indices, sections):
+            for word in self.words(section):
+                grouped.setdefault(word, []).append(int(i))
+        for word, gone in grouped.items():
+            old = self.postings.get(word)
+            if old is None:
+                continue
+            kept = old[~np.isin(old, gone)]
+            if len(kept):
+                self.postings[word] = kept
+            else:
+                del self.postings[word]
+        self.num_sections -= len(sections)
+
+    def idf(self, word):
+        """
+        Smoothed IDF of a word, or 0 if it's unindexed or too frequent to count.
+        """
+        postings = self.postings.get(word)
+        if postings is None or len(postings) > self.max_df * max(self.num_sections, 1):
+            return 0.0
+        return float(np.log((1 + self.num_sections) / (1 + len(postings))) + 1)
+
+    def top_k(self, words, top_n=None):
+        """
+        Sections sharing header words, scored by the summed IDF of shared words.
+
+        Returns:
+            tuple: (indices, scores), best first, ties broken by index
+        """
+        weighted = [(self.postings[word], self.idf(word)) for word in set(words)
+                    if word in self.postings]
+        weighted = [(postings, weight) for postings, weight in weighted if weight > 0]
+        if not weighted:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        touched = np.concatenate([postings for postings, _ in weighted])
+        weights = np.concatenate([np.full(len(postings), weight) for postings, weight in weighted])
+        indices, inverse = np.unique(touched, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        if top_n is not None and top_n < len(indices):
+            # Keep everything tied with the k-th score, then order exactly
+            kth = np.partition(-scores, top_n - 1)[top_n - 1]
+            keep = -scores <= kth
+            indices, scores = indices[keep], scores[keep]
+        order = np.lexsort((indices, -scores))[:top_n]
+        return indices[order].astype(np.int64), scores[order]
+
+    def top_k_many(self, word_lists, top_n=None):
+        """
+        `top_k` for a batch of queries. Postings of each distinct word are read
+        once, and all (query, section) scores are accumulated together.
+
+        Returns:
+            list of tuple: (indices, scores) per query, as from `top_k`
+        """
+        weighted = {}
+        queries, touched, weights = [], [], []
+        for query, words in enumerate(word_lists):
+            for word in set(words):
+                if word not in weighted:
+                    weighted[word] = (self.postings.get(word), self.idf(word))
+                postings, weight = weighted[word]
+                if postings is None or weight <= 0:
+                    continue
+                queries.append(np.full(len(postings), query))
+                touched.append(postings)
+                weights.append(np.full(len(postings), weight))
+
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0))
+        if not touched:
+            return [empty] * len(word_lists)
+
+        touched = np.concatenate(touched).astype(np.int64)
+        slots = int(touched.max()) + 1
+        pairs, inverse = np.unique(np.concatenate(queries) * slots + touched, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+        pair_queries, indices = pairs // slots, pairs % slots
+
+        order = np.lexsort((indices, -scores, pair_queries))
+        bounds = np.searchsorted(pair_queries[order], np.arange(len(word_lists) + 1))
+        return [(indices[order[lo:hi][:top_n]], scores[order[lo:hi][:top_n]])
+                for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def __getitem__(self, word):
+        return self.postings[word]
+
+    def __iter__(self):
+        return iter(self.postings)
+
+    def __len__(self):
+        return len(self.postings)
@@ -0,0 +1,254 @@
+"""
+On-disk snapshot of `build_all_indexes` output, opened with memory mapping.
+
+A snapshot is a directory of .npy arrays plus a manifest.json holding the format
+version, index parameters and the byte size and SHA-256 checksum of each array
+file. Opening checks the sizes, which catches truncated or partly copied files
+without reading them; checksums are checked on request. Arrays are mapped
+copy-on-write, so every process that opens the same snapshot shares its pages
+and a cold start costs little more than building the small term dicts.
+
+Sections themselves are not stored; pass the same section list to
+`load_snapshot`, it's checked against the saved section ids.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+
+from src.processing.flat_index import BandedLSH, FlatPostings, decode_strings, encode_strings
+from src.processing.hashed_tfidf import HashedTfidf
+from src.processing.header_index import HeaderIndex
+from src.processing.quote_index import QuoteIndex
+from src.processing.section_store import SectionStore
+
+# Bump when the layout changes; older snapshots are rejected
+SNAPSHOT_VERSION = 4
+
+MANIFEST = "manifest.json"
+
+# TfidfVectorizer settings kept in the manifest, enough to transform queries
+TFIDF_PARAMS = ("lowercase", "token_pattern", "ngram_range", "min_df", "max_df",
+                "norm", "use_idf", "smooth_idf", "sublinear_tf")
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def csr_arrays(prefix, matrix):
+    matrix = sparse.csr_matrix(matrix)
+    return {
+        f"{prefix}_data": matrix.data,
+        f"{prefix}_indices": matrix.indices,
+        f"{prefix}_indptr": matrix.indptr,
+    }
+
+
+def csr_from_arrays(prefix, arrays, shape):
+    return sparse.csr_matrix(
+        (arrays[f"{prefix}_data"], arrays[f"{prefix}_indices"], arrays[f"{prefix}_indptr"]),
+        shape=tuple(shape))
+
+
+def postings_arrays(prefix, index):
+    flat = index if isinstance(index, FlatPostings) else FlatPostings.from_dict(index)
+    blob, offsets = encode_strings(flat.terms)
+    return {
+        f"{prefix}_terms": blob,
+        f"{prefix}_term_offsets": offsets,
+        f"{prefix}_indptr": flat.indptr,
+        f"{prefix}_postings": flat.postings,
+    }
+
+
+def postings_from_arrays(prefix, arrays):
+    terms = decode_strings(arrays[f"{prefix}_terms"], arrays[f"{prefix}_term_offsets"])
+    return FlatPostings(terms, arrays[f"{prefix}_indptr"], arrays[f"{prefix}_postings"])
+
+
+def save_snapshot(indexes, path):
+    """
+    Write indexes built by `build_all_indexes` (and possibly updated with
+    `add_sections` / `remove_sections`) to a snapshot directory. The manifest
+    is written last, so a partially written snapshot never opens.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    store = indexes['store']
+    ids_blob, ids_offsets = encode_strings([section['section_id'] for section in store])
+    arrays = {"section_ids": ids_blob, "section_id_offsets": ids_offsets, "alive": store.alive}
+    meta = {"num_sections": len(store)}
+
+    vectorizer, tfidf_matrix = indexes['vectorizer'], indexes['tfidf_matrix']
+    meta["tfidf_shape"] = list(tfidf_matrix.shape)
+    arrays.update(csr_arrays("tfidf", tfidf_matrix))
+    if isinstance(vectorizer, HashedTfidf):
+        meta["tfidf"] = {
+            "kind": "hashed",
+            "n_features": vectorizer.n_features,
+            "min_df": vectorizer.min_df,
+            "max_df": vectorizer.max_df,
+            "refresh_fraction": vectorizer.refresh_fraction,
+            "num_docs": vectorizer.num_docs,
+            "changed": vectorizer.changed,
+        }
+        arrays.update(csr_arrays("counts", vectorizer.counts))
+        arrays.update({"df": vectorizer.df, "idf": vectorizer.idf, "tfidf_alive": vectorizer.alive})
+    else:
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        params = vectorizer.get_params()
+        meta["tfidf"] = {"kind": "vocabulary",
+                         "params": {name: params[name] for name in TFIDF_PARAMS}}
+        arrays["vocab"], arrays["vocab_offsets"] = encode_strings(terms)
+        arrays["idf"] = vectorizer.idf_
+
+    lsh = indexes['lsh_index']
+    meta["lsh"] = {"hashranges": [list(band) for band in lsh.hashranges], "num_perm": lsh.h}
+    arrays["minhash_signatures"] = indexes['minhash_signatures']
+    banded = BandedLSH.from_signatures(
+        indexes['minhash_signatures'], store.live_indices(), lsh.hashranges)
+    arrays["lsh_keys"], arrays["lsh_members"] = banded.sorted_keys, banded.members
+
+    header_index = indexes['header_index']
+    meta["header"] = {"num_sections": header_index.num_sections, "max_df": header_index.max_df,
+                      "stopwords": sorted(header_index.stopwords)}
+    arrays.update(postings_arrays("header", header_index))
+    quote_index = indexes['quote_index']
+    quote_index.compact()
+    meta["quote"] = {"width": quote_index.width, "min_overlap": quote_index.min_overlap,
+                     "max_postings": quote_index.max_postings}
+    arrays["quote_keys"], arrays["quote_members"] = quote_index.keys, quote_index.members
+
+    entries = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        file_path = os.path.join(path, f"{name}.npy")
+        np.save(file_path, array)
+        entries[name] = {
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+            "size": os.path.getsize(file_path),
+            "sha256": file_checksum(file_path),
+        }
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "meta": meta, "arrays": entries}, f)
+
+
+def read_manifest(path):
+    """
+    Read a snapshot manifest, rejecting other format versions.
+    """
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No index snapshot at {path}")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Index snapshot version {manifest.get('version')} at {path}, expected {SNAPSHOT_VERSION}")
+    return manifest
+
+
+def check_sizes(path, manifest):
+    """
+    Check every array file exists with the size recorded in the manifest. Only
+    stats the files, so it's cheap enough for every open.
+    """
+    for name, entry in manifest["arrays"].items():
+        file_path = os.path.join(path, f"{name}.npy")
+        if not os.path.exists(file_path):
+            raise ValueError(f"Missing {name} in index snapshot at {path}")
+        if os.path.getsize(file_path) != entry["size"]:
+            raise ValueError(f"Size mismatch for {name} in index snapshot at {path}")
+    return manifest
+
+
+def verify_snapshot(path):
+    """
+    Check every array file against its checksum. Reads the whole snapshot, so
+    run it after writing or copying one, not on every open.
+    """
+    manifest = check_sizes(path, read_manifest(path))
+    for name, entry in manifest["arrays"].items():
+        if file_checksum(os.path.join(path, f"{name}.npy")) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {name} in index snapshot at {path}")
+    return manifest
+
+
+def load_snapshot(path, all_sections, verify=False):
+    """
+    Open a snapshot written by `save_snapshot` as an indexes dict usable by
+    `find_candidates`, `add_sections` and `remove_sections`.
+
+    Args:
+        path: Snapshot directory.
+        all_sections: The section list the indexes were built over, in the
+            same order (including removed sections).
+        verify: Also check array checksums first (reads every page). By
+            default only the file sizes are checked against the manifest,
+            which catches truncated or missing files but not corruption that
+            keeps the size.
+
+    Returns:
+        Dict of indexes, with arrays memory-mapped copy-on-write
+    """
+    manifest = verify_snapshot(path) if verify else check_sizes(path, read_manifest(path))
+    meta = manifest["meta"]
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c")
+        if list(array.shape) != entry["shape"] or array.dtype.str != entry["dtype"]:
+            raise ValueError(f"Array {name} in index snapshot at {path} doesn't match its manifest")
+        arrays[name] = array
+
+    section_ids = decode_strings(arrays["section_ids"], arrays["section_id_offsets"])
+    if section_ids != [section['section_id'] for section in all_sections]:
+        raise ValueError(f"Sections don't match the ones index snapshot at {path} was built over")
+    store = SectionStore(all_sections)
+    store.remove(np.flatnonzero(~arrays["alive"]))
+
+    indexes = {'store': store}
+    indexes['tfidf_matrix'] = csr_from_arrays("tfidf", arrays, meta["tfidf_shape"])
+    tfidf = meta["tfidf"]
+    if tfidf["kind"] == "hashed":
+        vectorizer = HashedTfidf(tfidf["n_features"], tfidf["min_df"], tfidf["max_df"],
+                                 tfidf["refresh_fraction"])
+        vectorizer.counts = csr_from_arrays("counts", arrays, meta["tfidf_shape"])
+        vectorizer.matrix = indexes['tfidf_matrix']
+        vectorizer.df, vectorizer.idf, vectorizer.alive = arrays["df"], arrays["idf"], arrays["tfidf_alive"]
+        vectorizer.num_docs, vectorizer.changed = tfidf["num_docs"], tfidf["changed"]
+    else:
+        params = dict(tfidf["params"], ngram_range=tuple(tfidf["params"]["ngram_range"]))
+        vectorizer = TfidfVectorizer(**params)
+        vectorizer.vocabulary_ = {
+            term: i for i, term in enumerate(decode_strings(arrays["vocab"], arrays["vocab_offsets"]))}
+        vectorizer.idf_ = arrays["idf"]
+    indexes['vectorizer'] = vectorizer
+
+    indexes['minhash_signatures'] = arrays["minhash_signatures"]
+    indexes['lsh_index'] = BandedLSH(
+        meta["lsh"]["hashranges"], arrays["lsh_keys"], arrays["lsh_members"], meta["lsh"]["num_perm"])
+
+    header = postings_from_arrays("header", arrays)
+    indexes['header_index'] = HeaderIndex(
+        {term: header[term] for term in header}, meta["header"]["num_sections"],
+        meta["header"]["max_df"], meta["header"]["stopwords"])
+    indexes['quote_index'] = QuoteIndex(**meta["quote"])
+    indexes['quote_index'].keys = arrays["quote_keys"]
+    indexes['quote_index'].members = arrays["quote_members"]
+
+    return indexes
@@ -1,7 +1,25 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import datasketch
 import numpy as np
+from scipy import sparse
+
+from src.processing.flat_index import BandedLSH
+from src.processing.hashed_tfidf import HashedTfidf
+from src.processing.header_index import HeaderIndex
+from src.processing.minhash_signatures import MinHashSignature, minhash_signature, minhash_signatures
+from src.processing.quote_index import QuoteIndex
+from src.processing.section_store import SectionStore
+from src.processing.top_k import top_k_rows
+
+# TF-IDF matrix, set once per worker process for batched candidate generation
+WORKER_TFIDF_MATRIX = None
+
+# Hard cap on a query's total alignment cost, in DP cells (query tokens x
+# candidate tokens summed over candidates), for adaptive candidate budgets
+MAX_ALIGNMENT_COST = 4_000_000
 
 
 def build_tfidf_index(all_sections):
@@ -15,179 +33,556 @@ def build_tfidf_index(all_sections):
     return vectorizer, tfidf_matrix
 
 
-def find_candidate_sections(query_section, vectorizer, tfidf_matrix, all_sections, top_n=500):
+def tfidf_candidate_indices(query_section, vectorizer, tfidf_matrix, top_n=500):
     # Transform query section
     query_vector = vectorizer.transform([query_section['normalized_output']])
 
-    # Calculate cosine similarities
-    similarities = cosine_similarity(query_vector, tfidf_matrix).flatten()
+    # Get indices of top N similar sections, ranked as in the batched path
+    top_indices, _ = score_query_block(query_vector, tfidf_matrix, top_n)
+    return top_indices[0]
+
+
+def tfidf_candidate_indices_batch(query_sections, vectorizer, tfidf_matrix, top_n=500, block_size=256):
+    """
+    `tfidf_candidate_indices` for many queries: one transform, then one sparse
+    product per block of query rows.
+    """
+    if not query_sections:
+        return []
+    query_matrix = vectorizer.transform([section['normalized_output'] for section in query_sections])
+    found = []
+    for start in range(0, query_matrix.shape[0], block_size):
+        top_indices, _ = score_query_block(query_matrix[start:start + block_size], tfidf_matrix, top_n)
+        found.extend(top_indices)
+    return found
 
-    # Get indices of top N similar sections
-    top_indices = np.argsort(similarities)[-top_n:][::-1]
+
+def find_candidate_sections(query_section, vectorizer, tfidf_matrix, all_sections, top_n=500):
+    top_indices = tfidf_candidate_indices(
+        query_section, vectorizer, tfidf_matrix, top_n)
 
     # Return candidate sections
     return [all_sections[i] for i in top_indices]
 
 
+def score_query_block(query_block, tfidf_matrix, top_n):
+    """
+    Cosine similarities of a block of query rows against the whole matrix, reduced
+    to the top-n per row. TF-IDF rows are L2-normalized, so the sparse product is
+    the cosine similarity.
+    """
+    similarities = (query_block @ tfidf_matrix.T).toarray()
+    return top_k_rows(similarities, top_n)
+
+
+def init_tfidf_worker(tfidf_matrix):
+    global WORKER_TFIDF_MATRIX
+    WORKER_TFIDF_MATRIX = tfidf_matrix
+
+
+def worker_query_block(query_block, top_n):
+    """
+    worker at top level otherwise run into pickling issues
+    """
+    return score_query_block(query_block, WORKER_TFIDF_MATRIX, top_n)
+
+
+def iter_top_k_blocks(query_matrix, tfidf_matrix, top_n=100, block_size=256, workers=None):
+    """
+    Stream top-n TF-IDF candidates for every row of `query_matrix`, one block of
+    rows at a time, so memory stays bounded by block_size x corpus size.
+
+    Args:
+        query_matrix: Sparse TF-IDF rows for the queries.
+        tfidf_matrix: Sparse TF-IDF matrix of the corpus.
+        top_n: Candidates kept per query.
+        block_size: Query rows multiplied at once.
+        workers: If set, score blocks in a process pool of this size.
+
+    Yields:
+        tuple: (query_indices, candidate_indices, scores) flat arrays for one block,
+        each query's candidates best first.
+    """
+    starts = range(0, query_matrix.shape[0], block_size)
+
+    def triples(start, indices, scores):
+        rows = np.repeat(np.arange(start, start + indices.shape[0]), indices.shape[1])
+        return rows, indices.ravel(), scores.ravel()
+
+    if not workers:
+        for start in starts:
+            yield triples(start, *score_query_block(
+                query_matrix[start:start + block_size], tfidf_matrix, top_n))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_tfidf_worker,
+                             initargs=(tfidf_matrix,)) as executor:
+        # Keep a bounded window of blocks in flight, yielding in order
+        pending = deque()
+        for start in starts:
+            pending.append((start, executor.submit(
+                worker_query_block, query_matrix[start:start + block_size], top_n)))
+            if len(pending) >= 2 * workers:
+                start, future = pending.popleft()
+                yield triples(start, *future.result())
+        while pending:
+            start, future = pending.popleft()
+            yield triples(start, *future.result())
+
+
+def find_candidate_sections_batch(query_sections, vectorizer, tfidf_matrix, top_n=500, block_size=256, workers=None):
+    """
+    Batch version of `find_candidate_sections`, streaming
+    (query, candidate, score) index triples in chunks.
+    """
+    query_matrix = vectorizer.transform(
+        [section['normalized_output'] for section in query_sections])
+    return iter_top_k_blocks(query_matrix, tfidf_matrix, top_n, block_size, workers)
+
+
+def all_vs_all_candidates(tfidf_matrix, top_n=100, block_size=256, workers=None):
+    """
+    Top-n TF-IDF candidates for every section in the corpus, streamed in chunks
+    of (query, candidate, score) index triples. A section is its own best match.
+    """
+    return iter_top_k_blocks(tfidf_matrix, tfidf_matrix, top_n, block_size, workers)
+
+
 def build_header_index(all_sections):
-    header_index = {}
-    for i, section in enumerate(all_sections):
-        header = section.get('normalized_header', '')
-        words = set(header.split())
-        for word in words:
-            if word not in header_index:
-                header_index[word] = []
-            header_index[word].append(i)
-    return header_index
+    return HeaderIndex.build(all_sections)
 
 
-def find_sections_by_header(query_section, header_index, all_sections):
+def header_candidate_indices(query_section, header_index, top_n=None):
     query_header = query_section.get('normalized_header', '')
-    query_words = set(query_header.split())
 
-    # Count sections that share header words
-    section_counts = {}
-    for word in query_words:
-        if word in header_index:
-            for section_idx in header_index[word]:
-                section_counts[section_idx] = section_counts.get(
-                    section_idx, 0) + 1
+    # Sections sharing header words, best summed IDF first
+    indices, _ = header_index.top_k(query_header.split(), top_n)
+    return indices
 
-    # Sort by count of shared words
-    sorted_sections = sorted(section_counts.items(),
-                             key=lambda x: x[1], reverse=True)
 
-    return [all_sections[idx] for idx, _ in sorted_sections]
+def header_candidate_indices_batch(query_sections, header_index, top_n=None):
+    word_lists = [section.get('normalized_header', '').split() for section in query_sections]
+    return [indices for indices, _ in header_index.top_k_many(word_lists, top_n)]
 
 
-def create_minhash_index(all_sections, num_perm=128):
-    # Create LSH index
-    lsh = datasketch.MinHashLSH(threshold=0.5, num_perm=num_perm)
+def find_sections_by_header(query_section, header_index, all_sections):
+    return [all_sections[idx] for idx in header_candidate_indices(query_section, header_index)]
 
-    # Create MinHash for each section and add to LSH
-    for i, section in enumerate(all_sections):
-        text = section['normalized_output']
-        # Create shingles (character n-grams)
-        shingles = [text[i:i+4] for i in range(len(text)-3)]
 
-        # Create MinHash
-        m = datasketch.MinHash(num_perm=num_perm)
-        for s in shingles:
-            m.update(s.encode('utf-8'))
+def build_minhash_signatures(all_sections, num_perm=128, workers=None):
+    """
+    (N x num_perm) uint64 MinHash signatures of every section's 4-character
+    shingles, optionally computed across a process pool. Save with
+    `save_signatures` and pass back to `create_minhash_index` to skip hashing.
+    """
+    texts = [section['normalized_output'] for section in all_sections]
+    return minhash_signatures(texts, num_perm, workers=workers)
 
-        # Add to LSH
-        lsh.insert(str(i), m)
 
-    return lsh
+def create_minhash_index(all_sections, num_perm=128, workers=None, signatures=None):
+    # Create LSH index
+    lsh = datasketch.MinHashLSH(threshold=0.5, num_perm=num_perm)
 
+    # Signatures for every section, computed in bulk unless precomputed
+    if signatures is None:
+        signatures = build_minhash_signatures(all_sections, num_perm, workers)
 
-def query_minhash_lsh(query_section, lsh, all_sections, num_perm=128):
-    text = query_section['normalized_output']
+    # Add to LSH
+    for i, hashvalues in enumerate(signatures):
+        lsh.insert(str(i), MinHashSignature(hashvalues))
+
+    return lsh
 
-    # Create shingles
-    shingles = [text[i:i+4] for i in range(len(text)-3)]
 
-    # Create MinHash
-    m = datasketch.MinHash(num_perm=num_perm)
-    for s in shingles:
-        m.update(s.encode('utf-8'))
+def lsh_candidate_indices(query_section, lsh, num_perm=128):
+    # Signature of the query's shingles, same fast path as the index
+    m = MinHashSignature(minhash_signature(query_section['normalized_output'], num_perm))
 
     # Query LSH
     result_indices = lsh.query(m)
 
+    return np.array(sorted(int(idx) for idx in result_indices), dtype=np.int64)
+
+
+def lsh_candidate_indices_batch(query_sections, lsh, num_perm=128, workers=None):
+    """
+    `lsh_candidate_indices` for many queries: signatures are hashed in bulk,
+    and a `BandedLSH` answers the whole batch with one search per band.
+    """
+    signatures = build_minhash_signatures(query_sections, num_perm, workers)
+    if hasattr(lsh, 'query_many'):
+        return lsh.query_many(signatures)
+    return [np.array(sorted(int(idx) for idx in lsh.query(MinHashSignature(hashvalues))), dtype=np.int64)
+            for hashvalues in signatures]
+
+
+def banded_lsh_index(indexes):
+    """
+    The LSH index as a `BandedLSH`, for bulk lookups. A datasketch index is
+    converted once from the stored signatures, then kept in sync by
+    `add_sections` and `remove_sections`.
+    """
+    lsh = indexes['lsh_index']
+    if hasattr(lsh, 'query_many'):
+        return lsh
+    if 'banded_lsh' not in indexes:
+        indexes['banded_lsh'] = BandedLSH.from_signatures(
+            indexes['minhash_signatures'], indexes['store'].live_indices(), lsh.hashranges)
+    return indexes['banded_lsh']
+
+
+def query_minhash_lsh(query_section, lsh, all_sections, num_perm=128):
     # Convert indices back to sections
-    return [all_sections[int(idx)] for idx in result_indices]
+    return [all_sections[idx] for idx in lsh_candidate_indices(query_section, lsh, num_perm)]
 
 
-def build_quote_index(all_sections):
-    quote_index = {}
-    for i, section in enumerate(all_sections):
-        tags = section.get('tags', [])
-        for tag in tags:
-            if tag['type'] == 'QUOTE':
-                quote = tag['enclosed_text']
-                if quote not in quote_index:
-                    quote_index[quote] = []
-                quote_index[quote].append(i)
-    return quote_index
+def build_quote_index(all_sections, min_overlap=5):
+    return QuoteIndex.build(all_sections, min_overlap=min_overlap)
 
 
-def find_sections_by_quotes(query_section, quote_index, all_sections):
-    tags = query_section.get('tags', [])
-    candidate_indices = set()
+def quote_candidate_indices(query_section, quote_index, min_overlap=None):
+    # Sections whose quotes or quoted blocks overlap the query's
+    return quote_index.query(query_section, min_overlap)
 
-    for tag in tags:
-        if tag['type'] == 'QUOTE':
-            quote = tag['enclosed_text']
-            if quote in quote_index:
-                candidate_indices.update(quote_index[quote])
 
-    return [all_sections[i] for i in candidate_indices]
+def quote_candidate_indices_batch(query_sections, quote_index, min_overlap=None):
+    return quote_index.query_many(query_sections, min_overlap)
 
 
-def find_candidates(query_section, all_sections, indexes, max_candidates=100):
+def find_sections_by_quotes(query_section, quote_index, all_sections):
+    return [all_sections[i] for i in quote_candidate_indices(query_section, quote_index)]
+
+
+def find_candidate_indices(query_section, indexes, max_candidates=100):
     """
-    Combined approach using multiple filters to identify candidate sections
+    Combined approach using multiple filters, as stable section indices.
 
     Args:
         query_section: The section to find matches for
-        all_sections: List of all potential sections
         indexes: Dict containing all precomputed indexes
-        max_candidates: Maximum number of candidates to return
+        max_candidates: Maximum number of candidates to fill up to with TF-IDF
 
     Returns:
-        List of candidate sections
+        np.ndarray of candidate section indices: quote, header and LSH
+        candidates in index order, then TF-IDF candidates by rank
     """
-    candidates = set()
-
-    # 1. Try exact quote matching (high precision)
-    quote_candidates = find_sections_by_quotes(
-        query_section, indexes['quote_index'], all_sections)
-    candidates.update([section['section_id'] for section in quote_candidates])
+    # 1. Try quote matching, exact or overlapping (high precision)
+    quote_candidates = quote_candidate_indices(
+        query_section, indexes['quote_index'])
 
     # 2. Try header matching
-    header_candidates = find_sections_by_header(
-        query_section, indexes['header_index'], all_sections)
-    candidates.update([section['section_id']
-                      for section in header_candidates[:50]])
+    header_candidates = header_candidate_indices(
+        query_section, indexes['header_index'], top_n=50)
 
     # 3. LSH for approximate matching
-    lsh_candidates = query_minhash_lsh(
-        query_section, indexes['lsh_index'], all_sections)
-    candidates.update([section['section_id'] for section in lsh_candidates])
+    lsh_candidates = lsh_candidate_indices(query_section, indexes['lsh_index'])
+
+    candidates = np.unique(np.concatenate(
+        [quote_candidates, header_candidates, lsh_candidates]))
 
     # 4. TF-IDF for remaining slots
     if len(candidates) < max_candidates:
-        tfidf_candidates = find_candidate_sections(
+        tfidf_candidates = tfidf_candidate_indices(
             query_section, indexes['vectorizer'], indexes['tfidf_matrix'],
-            all_sections, max_candidates)
+            max_candidates)
+
+        # Rows of removed sections are zeroed, but can still fill the tail
+        if 'store' in indexes:
+            tfidf_candidates = tfidf_candidates[indexes['store'].alive[tfidf_candidates]]
 
         # Add until we reach max_candidates
-        for section in tfidf_candidates:
-            candidates.add(section['section_id'])
-            if len(candidates) >= max_candidates:
-                break
+        new_candidates = tfidf_candidates[~np.isin(tfidf_candidates, candidates)]
+        candidates = np.concatenate(
+            [candidates, new_candidates[:max_candidates - len(candidates)]])
+
+    return candidates
+
+
+def adaptive_candidate_indices(query_section, indexes, max_candidates=100, min_score=0.1, drop_ratio=0.5,
+                               min_keep=5, max_cost=MAX_ALIGNMENT_COST, stats=None):
+    """
+    `find_candidate_indices` with a per-query budget, instead of always filling
+    up to `max_candidates`.
+
+    Quote matches go first. Header, LSH and TF-IDF candidates are ranked by
+    TF-IDF similarity and cut at the first score below `min_score`, or at a
+    knee, where the next score falls below `drop_ratio` times the current one
+    (after at least `min_keep` candidates). Candidates are then taken in order
+    while the query's total alignment cost, query tokens x candidate tokens
+    summed over candidates, stays within `max_cost`; one that doesn't fit is
+    skipped, so shorter ones further down can still use the budget.
+
+    Args:
+        query_section: The section to find matches for
+        indexes: Dict containing all precomputed indexes
+        max_candidates: Most candidates to return
+        min_score: Smallest TF-IDF similarity kept, quote matches aside
+        drop_ratio: Relative score drop that ends the ranking
+        min_keep: Ranked candidates kept before looking for a knee
+        max_cost: Hard cap on summed alignment cost, in DP cells
+        stats: Optional dict, filled with "pool" (candidates considered),
+            "kept", "cost", "cut" ("max_candidates", "min_score", "knee") and
+            "cost_skipped" (candidates past the cut dropped by `max_cost`)
+
+    Returns:
+        np.ndarray of candidate section indices: quote matches, then the rest,
+        best first
+    """
+    store = indexes['store']
+    tfidf_matrix = indexes['tfidf_matrix']
+    query_vector = indexes['vectorizer'].transform([query_section['normalized_output']])
+
+    quote_candidates = quote_candidate_indices(query_section, indexes['quote_index'])
+    tfidf_candidates = score_query_block(query_vector, tfidf_matrix, max_candidates)[0][0]
+    others = np.unique(np.concatenate([
+        header_candidate_indices(query_section, indexes['header_index'], top_n=50),
+        lsh_candidate_indices(query_section, indexes['lsh_index']),
+        tfidf_candidates[store.alive[tfidf_candidates]],
+    ]))
+    others = others[~np.isin(others, quote_candidates)]
+
+    # Similarity of every pooled candidate, best first, ties by index
+    def ranked(candidates):
+        scores = (query_vector @ tfidf_matrix[candidates].T).toarray().ravel()
+        order = np.lexsort((candidates, -scores))
+        return candidates[order], scores[order]
+
+    quote_candidates, _ = ranked(quote_candidates)
+    others, scores = ranked(others)
+
+    cut, reason = min(len(others), max(max_candidates - len(quote_candidates), 0)), "max_candidates"
+    below = np.flatnonzero(scores[:cut] < min_score)
+    if len(below):
+        cut, reason = below[0], "min_score"
+    min_keep = max(min_keep, 1)
+    if cut > min_keep:
+        drops = np.flatnonzero(scores[min_keep:cut] < drop_ratio * scores[min_keep - 1:cut - 1])
+        if len(drops):
+            cut, reason = min_keep + drops[0], "knee"
+
+    selected = np.concatenate([quote_candidates, others[:cut]])[:max_candidates]
+    costs = len(query_section['normalized_output'].split()) * store.token_lengths[selected]
+    kept, total = [], 0
+    for index, cost in zip(selected, costs):
+        if total + cost <= max_cost:
+            kept.append(index)
+            total += cost
+
+    if stats is not None:
+        stats.update({
+            "pool": len(quote_candidates) + len(others),
+            "kept": len(kept),
+            "cost": int(total),
+            "cut": reason,
+            "cost_skipped": len(selected) - len(kept),
+        })
+    return np.array(kept, dtype=np.int64)
+
+
+def find_candidates(query_section, all_sections, indexes, max_candidates=100):
+    """
+    Combined approach using multiple filters to identify candidate sections
+
+    Args:
+        query_section: The section to find matches for
+        all_sections: List (or SectionStore) of all potential sections
+        indexes: Dict containing all precomputed indexes
+        max_candidates: Maximum number of candidates to return
+
+    Returns:
+        List of candidate sections
+    """
+    indices = find_candidate_indices(query_section, indexes, max_candidates)
+    return [all_sections[i] for i in indices]
+
+
+def find_candidate_indices_batch(query_sections, indexes, max_candidates=100, block_size=256, workers=None):
+    """
+    `find_candidate_indices` for many queries at once. Each filter runs over
+    the whole batch: quote and header postings are read once per distinct
+    key or word, MinHash signatures are hashed in bulk, and TF-IDF is one
+    sparse product per block, only for queries that still have free slots.
+
+    Args:
+        query_sections: Sections to find matches for
+        indexes: Dict containing all precomputed indexes
+        max_candidates: Maximum number of candidates to fill up to with TF-IDF
+        block_size: Query rows per TF-IDF product
+        workers: Process pool size for hashing query signatures
 
-    # Convert IDs back to full sections
-    id_to_section = {section['section_id']: section for section in all_sections}
-    return [id_to_section[section_id] for section_id in candidates]
+    Returns:
+        list of np.ndarray, the same as `find_candidate_indices` for each query
+    """
+    quote_candidates = quote_candidate_indices_batch(query_sections, indexes['quote_index'])
+    header_candidates = header_candidate_indices_batch(query_sections, indexes['header_index'], top_n=50)
+    lsh_candidates = lsh_candidate_indices_batch(query_sections, banded_lsh_index(indexes), workers=workers)
+
+    results = [np.unique(np.concatenate(found))
+               for found in zip(quote_candidates, header_candidates, lsh_candidates)]
+
+    # TF-IDF for remaining slots, scoring only the queries that need it
+    short = [i for i, candidates in enumerate(results) if len(candidates) < max_candidates]
+    tfidf_candidates = tfidf_candidate_indices_batch(
+        [query_sections[i] for i in short], indexes['vectorizer'], indexes['tfidf_matrix'],
+        max_candidates, block_size)
+
+    for i, found in zip(short, tfidf_candidates):
+        if 'store' in indexes:
+            found = found[indexes['store'].alive[found]]
+        new_candidates = found[~np.isin(found, results[i])]
+        results[i] = np.concatenate([results[i], new_candidates[:max_candidates - len(results[i])]])
 
+    return results
 
-def build_all_indexes(all_sections):
-    """Build all indexes for fast retrieval"""
+
+def find_candidates_batch(query_sections, all_sections, indexes, max_candidates=100, block_size=256,
+                          workers=None):
+    """
+    Candidate sections for many queries, see `find_candidate_indices_batch`.
+
+    Returns:
+        List of candidate section lists, one per query
+    """
+    return [[all_sections[i] for i in indices]
+            for indices in find_candidate_indices_batch(query_sections, indexes, max_candidates,
+                                                        block_size, workers)]
+
+
+def build_all_indexes(all_sections, incremental=False):
+    """
+    Build all indexes for fast retrieval
+
+    Args:
+        all_sections: List of all sections to index
+        incremental: Use hashed TF-IDF with deferred IDF recomputation, so
+            `add_sections` / `remove_sections` never need a refit
+
+    Returns:
+        Dict of indexes
+    """
     indexes = {}
 
-    # TF-IDF index
-    indexes['vectorizer'], indexes['tfidf_matrix'] = build_tfidf_index(
-        all_sections)
+    # Stable integer index for every section, kept between queries
+    indexes['store'] = SectionStore(all_sections)
 
-    # Header word index
+    # TF-IDF index
+    if incremental:
+        indexes['vectorizer'] = HashedTfidf.fit(
+            [section['normalized_output'] for section in all_sections])
+        indexes['tfidf_matrix'] = indexes['vectorizer'].matrix
+    else:
+        indexes['vectorizer'], indexes['tfidf_matrix'] = build_tfidf_index(
+            all_sections)
+
+    # IDF-weighted header word index
     indexes['header_index'] = build_header_index(all_sections)
 
-    # MinHash LSH index
-    indexes['lsh_index'] = create_minhash_index(all_sections)
+    # MinHash signatures, kept for saving and reuse, and the LSH index over them
+    indexes['minhash_signatures'] = build_minhash_signatures(all_sections)
+    indexes['lsh_index'] = create_minhash_index(
+        all_sections, signatures=indexes['minhash_signatures'])
 
-    # Quote index
+    # Quote and quoted block shingle index
     indexes['quote_index'] = build_quote_index(all_sections)
 
     return indexes
+
+
+def add_sections(indexes, new_sections):
+    """
+    Add sections to prebuilt indexes in place, without a rebuild.
+
+    Header, quote and LSH indexes are updated exactly. With hashed TF-IDF
+    (`build_all_indexes(..., incremental=True)`) new rows use the current IDF
+    until the next refresh; with a fitted `TfidfVectorizer` the vocabulary and
+    IDF stay frozen until the next full rebuild.
+
+    Returns:
+        np.ndarray of the new sections' stable indices
+    """
+    indices = indexes['store'].add(new_sections)
+    indexes['header_index'].add(new_sections, indices)
+    indexes['quote_index'].add(new_sections, indices)
+
+    lsh = indexes['lsh_index']
+    signatures = build_minhash_signatures(new_sections, lsh.h)
+    indexes['minhash_signatures'] = np.concatenate(
+        [indexes['minhash_signatures'], signatures])
+    for i, hashvalues in zip(indices, signatures):
+        lsh.insert(str(i), MinHashSignature(hashvalues))
+        if 'banded_lsh' in indexes:
+            indexes['banded_lsh'].insert(str(i), MinHashSignature(hashvalues))
+
+    vectorizer = indexes['vectorizer']
+    texts = [section['normalized_output'] for section in new_sections]
+    if isinstance(vectorizer, HashedTfidf):
+        vectorizer.add(texts)
+        indexes['tfidf_matrix'] = vectorizer.matrix
+    else:
+        indexes['tfidf_matrix'] = sparse.vstack(
+            [indexes['tfidf_matrix'], vectorizer.transform(texts)], format='csr')
+
+    return indices
+
+
+def remove_sections(indexes, indices):
+    """
+    Remove sections from prebuilt indexes in place. Their indices are never
+    reused, and their TF-IDF rows are zeroed.
+    """
+    store = indexes['store']
+    indices = [int(i) for i in indices if store.alive[i]]
+    sections = store.take(indices)
+    indexes['header_index'].remove(sections, indices)
+    indexes['quote_index'].remove(sections, indices)
+
+    lsh = indexes['lsh_index']
+    for i in indices:
+        lsh.remove(str(i))
+        if 'banded_lsh' in indexes:
+            indexes['banded_lsh'].remove(str(i))
+
+    vectorizer = indexes['vectorizer']
+    if isinstance(vectorizer, HashedTfidf):
+        vectorizer.remove(indices)
+        indexes['tfidf_matrix'] = vectorizer.matrix
+    else:
+        tfidf_matrix = indexes['tfidf_matrix']
+        for i in indices:
+            tfidf_matrix.data[tfidf_matrix.indptr[i]:tfidf_matrix.indptr[i + 1]] = 0
+
+    store.remove(indices)
+
+
+def ranking_drift(indexes, query_sections, top_n=100):
+    """
+    How far incrementally updated indexes have drifted from a full rebuild
+    over the same live sections.
+
+    Returns:
+        dict: { "tfidf_overlap", "candidate_overlap" }, the mean fraction of
+        each query's top-n TF-IDF and combined candidates shared with the
+        rebuilt indexes, plus "queries"
+    """
+    store = indexes['store']
+    live = store.live_indices()
+    rebuilt = build_all_indexes(store.take(live))
+
+    tfidf_overlap, candidate_overlap = [], []
+    for query in query_sections:
+        incremental = tfidf_candidate_indices(
+            query, indexes['vectorizer'], indexes['tfidf_matrix'], top_n)
+        incremental = incremental[store.alive[incremental]]
+        full = live[tfidf_candidate_indices(
+            query, rebuilt['vectorizer'], rebuilt['tfidf_matrix'], top_n)]
+        tfidf_overlap.append(len(np.intersect1d(incremental, full)) / max(len(full), 1))
+
+        incremental = find_candidate_indices(query, indexes, top_n)
+        full = live[find_candidate_indices(query, rebuilt, top_n)]
+        candidate_overlap.append(len(np.intersect1d(incremental, full)) / max(len(full), 1))
+
+    return {
+        "tfidf_overlap": float(np.mean(tfidf_overlap)) if query_sections else 1.0,
+        "candidate_overlap": float(np.mean(candidate_overlap)) if query_sections else 1.0,
+        "queries": len(query_sections),
+    }
@@ -0,0 +1,295 @@
+"""
+Scheduling score-only Smith-Waterman jobs across a process pool.
+
+Pair costs are estimated as m x n. Jobs are dispatched longest first, tiny pairs
+are batched into chunks to cut IPC overhead, and very large pairs are split into
+a grid of column strips and row bands that is computed as a wavefront, so one
+huge pair no longer leaves the other workers idle.
+
+With a `TokenCorpus`, pairs are (query_idx, candidate_idx) and workers read token
+ids from shared memory instead of receiving pickled token lists.
+"""
+
+import heapq
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from src.processing.compare_fn import (WILKERSON_WEIGHTS, compile_scoring, score_block,
+                                       score_encoded, smith_waterman_score)
+from src.processing.token_corpus import TokenCorpus
+
+# Pairs cheaper than this (in cells) are batched together
+CHUNK_COST = 200_000
+
+# Pairs costlier than this (in cells) are split into blocks
+SPLIT_COST = 20_000_000
+
+# Shared token corpus, attached once per worker process
+WORKER_CORPUS = None
+
+
+def estimate_cost(pair, corpus=None):
+    """
+    Estimated cost of aligning a pair, in DP cells.
+    """
+    target, candidate = pair
+    if corpus is not None:
+        return corpus.length(target) * corpus.length(candidate)
+    return len(target) * len(candidate)
+
+
+def init_corpus_worker(spec):
+    """
+    Process-pool initializer: attach to the shared token corpus.
+    """
+    global WORKER_CORPUS
+    WORKER_CORPUS = TokenCorpus.attach(spec)
+
+
+def worker_chunk(chunk, weights):
+    """
+    Score every pair in a chunk. Top level, otherwise run into pickling issues.
+
+    Returns:
+        tuple: (list of (index, score, end), busy seconds, worker pid)
+    """
+    start = time.perf_counter()
+    results = []
+    for index, target, candidate in chunk:
+        scored = smith_waterman_score(target, candidate, weights)
+        results.append((index, scored["score"], scored["end"]))
+    return results, time.perf_counter() - start, os.getpid()
+
+
+def worker_block(target_ids, candidate_ids, target_match, top_row, left_col, weights):
+    """
+    Score one block of a split pair.
+
+    Returns:
+        tuple: (score_block output, busy seconds, worker pid)
+    """
+    start = time.perf_counter()
+    result = score_block(target_ids, candidate_ids, target_match, top_row, left_col, weights)
+    return result, time.perf_counter() - start, os.getpid()
+
+
+def worker_corpus_chunk(chunk):
+    """
+    Score every (index, query_idx, candidate_idx) pair in a chunk against the
+    worker's shared corpus.
+    """
+    start = time.perf_counter()
+    corpus = WORKER_CORPUS
+    weights = corpus.spec["weights"]
+    results = []
+    for index, query_idx, candidate_idx in chunk:
+        target_ids = corpus.section(query_idx)
+        score, end = score_encoded(
+            target_ids, corpus.section(candidate_idx), corpus.token_match[target_ids], weights)
+        results.append((index, score, end))
+    return results, time.perf_counter() - start, os.getpid()
+
+
+def worker_corpus_block(query_idx, candidate_idx, rows, columns, top_row, left_col):
+    """
+    Score one block of a split corpus pair, slicing ids from shared memory.
+    """
+    start = time.perf_counter()
+    corpus = WORKER_CORPUS
+    target_ids = corpus.section(query_idx)[rows[0]:rows[1]]
+    result = score_block(
+        target_ids, corpus.section(candidate_idx)[columns[0]:columns[1]],
+        corpus.token_match[target_ids], top_row, left_col, corpus.spec["weights"])
+    return result, time.perf_counter() - start, os.getpid()
+
+
+def plan_chunks(pairs, indices, chunk_cost, corpus=None):
+    """
+    Batch cheap pairs into chunks of roughly `chunk_cost` cells each.
+
+    Returns:
+        list of tuple: (chunk cost, [(index, target, candidate), ...])
+    """
+    chunks = []
+    current, current_cost = [], 0
+    for index in indices:
+        target, candidate = pairs[index]
+        current.append((index, target, candidate))
+        current_cost += estimate_cost(pairs[index], corpus)
+        if current_cost >= chunk_cost:
+            chunks.append((current_cost, current))
+            current, current_cost = [], 0
+    if current:
+        chunks.append((current_cost, current))
+    return chunks
+
+
+def plan_split(pair, strips, bands, weights, corpus=None):
+    """
+    Cut a large pair into a grid of `bands` x `strips` blocks. Token pairs are
+    encoded here; corpus pairs are sliced by the workers themselves.
+
+    Returns:
+        dict: { "row_edges", "col_edges" }, plus "target_ids", "candidate_ids" and
+        "target_match" for token pairs.
+    """
+    target, candidate = pair
+    if corpus is not None:
+        m, n = corpus.length(target), corpus.length(candidate)
+        split = {}
+    else:
+        m, n = len(target), len(candidate)
+        target_ids, candidate_ids, target_match = compile_scoring(target, candidate, weights)
+        split = {
+            "target_ids": target_ids,
+            "candidate_ids": candidate_ids,
+            "target_match": target_match,
+        }
+    split["row_edges"] = np.linspace(0, m, min(bands, m) + 1).astype(int)
+    split["col_edges"] = np.linspace(0, n, min(strips, n) + 1).astype(int)
+    return split
+
+
+def schedule_alignments(pairs, workers=8, chunk_cost=CHUNK_COST, split_cost=SPLIT_COST,
+                        strips=None, bands=None, weights=WILKERSON_WEIGHTS, stats=None, corpus=None):
+    """
+    Score-only alignment of many (target, candidate) token pairs on a process pool.
+
+    Ready jobs wait in a max-heap keyed by estimated cost, and at most `workers`
+    jobs are in flight, so dispatch really is longest first. Split pairs release
+    each block once the blocks above and to its left are done, and their results
+    are identical to `smith_waterman_score`.
+
+    Args:
+        pairs (list of tuple): (target tokens, candidate tokens) pairs, or
+            (query_idx, candidate_idx) pairs when `corpus` is given.
+        workers (int): Process pool size.
+        chunk_cost (int): Pairs below this many cells are batched up to this size.
+        split_cost (int): Pairs above this many cells are split into blocks.
+        strips (int, optional): Column strips per split pair, default `workers`.
+        bands (int, optional): Row bands per split pair, default 4 x `workers`.
+        weights (dict): Smith-Waterman scoring parameters.
+        stats (dict, optional): Filled with "wall", "cells", "cells_per_s",
+            "pairs_per_s", "jobs", "split_pairs" and "utilisation" (busy fraction
+            of wall time per worker pid).
+        corpus (TokenCorpus, optional): Shared token corpus; its build weights
+            take precedence over `weights`.
+
+    Returns:
+        list of dict: { "score", "end" } per pair, in input order.
+    """
+    if corpus is not None:
+        weights = corpus.spec["weights"]
+    strips = strips or workers
+    bands = bands or 4 * workers
+    results = [None] * len(pairs)
+    busy = {}
+
+    # Plan: split, single and chunked jobs. Heap entries: (-cost, seq, kind, payload)
+    ready = []
+    seq = 0
+    splits = {}
+    cheap = []
+    for index, pair in enumerate(pairs):
+        cost = estimate_cost(pair, corpus)
+        if cost == 0:
+            results[index] = {"score": 0, "end": (0, 0)}
+        elif cost > split_cost:
+            splits[index] = plan_split(pair, strips, bands, weights, corpus)
+            splits[index].update({"pair": pair, "cost": cost, "done": {}, "best": (0, (0, 0))})
+            heapq.heappush(ready, (-cost, seq, "block", (index, 0, 0)))
+            seq += 1
+        elif cost < chunk_cost:
+            cheap.append(index)
+        else:
+            heapq.heappush(ready, (-cost, seq, "chunk", [(index, *pair)]))
+            seq += 1
+    cheap.sort(key=lambda index: estimate_cost(pairs[index], corpus), reverse=True)
+    for cost, chunk in plan_chunks(pairs, cheap, chunk_cost, corpus):
+        heapq.heappush(ready, (-cost, seq, "chunk", chunk))
+        seq += 1
+    num_jobs = len(ready)
+
+    def submit(executor, kind, payload):
+        if kind == "chunk" and corpus is not None:
+            return executor.submit(worker_corpus_chunk, payload)
+        if kind == "chunk":
+            return executor.submit(worker_chunk, payload, weights)
+        index, band, strip = payload
+        split = splits[index]
+        rows = slice(split["row_edges"][band], split["row_edges"][band + 1])
+        width = split["col_edges"][strip + 1] - split["col_edges"][strip]
+        top_row = split["done"][(band - 1, strip)][0] if band > 0 else np.zeros(width + 1)
+        left_col = split["done"][(band, strip - 1)][1] if strip > 0 else np.zeros(rows.stop - rows.start)
+        columns = slice(split["col_edges"][strip], split["col_edges"][strip + 1])
+        if corpus is not None:
+            return executor.submit(
+                worker_corpus_block, *split["pair"], (rows.start, rows.stop),
+                (columns.start, columns.stop), top_row, left_col)
+        return executor.submit(
+            worker_block, split["target_ids"][rows], split["candidate_ids"][columns],
+            split["target_match"][rows], top_row, left_col, weights)
+
+    def finish_block(index, band, strip, output):
+        nonlocal seq, num_jobs
+        split = splits[index]
+        split["done"][(band, strip)] = output
+        score, (r, c) = output[2], output[3]
+        cell = (int(split["row_edges"][band]) + r, int(split["col_edges"][strip]) + c)
+        # First best cell in row-major order across blocks
+        if score > split["best"][0] or (score == split["best"][0] > 0 and cell < split["best"][1]):
+            split["best"] = (score, cell)
+
+        num_bands, num_strips = len(split["row_edges"]) - 1, len(split["col_edges"]) - 1
+        for next_band, next_strip in ((band + 1, strip), (band, strip + 1)):
+            if next_band >= num_bands or next_strip >= num_strips:
+                continue
+            above = next_band == 0 or (next_band - 1, next_strip) in split["done"]
+            left = next_strip == 0 or (next_band, next_strip - 1) in split["done"]
+            if above and left:
+                heapq.heappush(ready, (-split["cost"], seq, "block", (index, next_band, next_strip)))
+                seq += 1
+                num_jobs += 1
+
+        if band == num_bands - 1 and strip == num_strips - 1:
+            score, end = split["best"]
+            results[index] = {"score": score, "end": end}
+            del splits[index]
+
+    start = time.perf_counter()
+    initializer, initargs = (init_corpus_worker, (corpus.spec,)) if corpus is not None else (None, ())
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        in_flight = {}
+        while ready or in_flight:
+            while ready and len(in_flight) < workers:
+                _, _, kind, payload = heapq.heappop(ready)
+                in_flight[submit(executor, kind, payload)] = (kind, payload)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, payload = in_flight.pop(future)
+                output, seconds, pid = future.result()
+                busy[pid] = busy.get(pid, 0) + seconds
+                if kind == "chunk":
+                    for index, score, end in output:
+                        results[index] = {"score": score, "end": end}
+                else:
+                    finish_block(*payload, output)
+    wall = time.perf_counter() - start
+
+    if stats is not None:
+        cells = sum(estimate_cost(pair, corpus) for pair in pairs)
+        stats.update({
+            "wall": wall,
+            "cells": cells,
+            "cells_per_s": cells / wall if wall else 0,
+            "pairs_per_s": len(pairs) / wall if wall else 0,
+            "jobs": num_jobs,
+            "split_pairs": sum(estimate_cost(pair, corpus) > split_cost for pair in pairs),
+            "utilisation": {pid: seconds / wall for pid, seconds in busy.items()},
+        })
+
+    return results
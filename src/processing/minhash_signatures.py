@@ -0,0 +1,138 @@
+"""
+Bulk MinHash signatures over character shingles, computed with NumPy.
+
+Shingles are hashed as arrays of code points instead of one `MinHash.update`
+call per shingle, and every permutation is applied to all of a section's
+shingle hashes at once. A corpus is one (N x num_perm) uint64 matrix, which can
+be saved, reloaded and inserted into a `datasketch.MinHashLSH`.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+# Permutations are (a * h + b) mod p, truncated to 32 bits, as in datasketch
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Character n-gram width of a shingle
+SHINGLE_WIDTH = 4
+
+# Shingle hashes permuted per pass, bounds memory at ROWS_PER_PASS x num_perm
+ROWS_PER_PASS = 4096
+
+# 64-bit FNV prime, to fold code points into one shingle hash
+FNV_PRIME = np.uint64(0x100000001B3)
+
+
+class MinHashSignature:
+    """
+    A precomputed signature, usable wherever `datasketch.MinHashLSH` expects a
+    MinHash (insert and query only read `hashvalues` and the length).
+    """
+
+    def __init__(self, hashvalues):
+        self.hashvalues = hashvalues
+
+    def __len__(self):
+        return len(self.hashvalues)
+
+
+@lru_cache(maxsize=None)
+def minhash_permutations(num_perm=128, seed=1):
+    """
+    Permutation parameters (a, b), each of shape (num_perm,). Both are below
+    2^32, so a * h + b never overflows uint64 for 32-bit h. Cached; don't mutate.
+    """
+    gen = np.random.RandomState(seed)
+    a = gen.randint(1, MAX_HASH, num_perm, dtype=np.uint64)
+    b = gen.randint(0, MAX_HASH, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingle_hashes(text, width=SHINGLE_WIDTH):
+    """
+    Distinct 32-bit hashes of every `width`-character shingle of the text.
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - width + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        hashes = (hashes ^ codes[offset:offset + count]) * FNV_PRIME
+    # Murmur3 finalizer, then keep the well-mixed high half
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xFF51AFD7ED558CCD)
+    hashes ^= hashes >> np.uint64(33)
+    return np.unique(hashes >> np.uint64(32))
+
+
+def minhash_signature(text, num_perm=128, seed=1, width=SHINGLE_WIDTH):
+    """
+    MinHash signature of the text's shingle set. A text shorter than one
+    shingle gets the empty signature (all MAX_HASH), like an un-updated MinHash.
+
+    Returns:
+        np.ndarray: uint64 array of shape (num_perm,)
+    """
+    a, b = minhash_permutations(num_perm, seed)
+    hashes = shingle_hashes(text, width)
+    signature = np.full(num_perm, MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), ROWS_PER_PASS):
+        block = hashes[start:start + ROWS_PER_PASS, None]
+        permuted = ((block * a + b) % MERSENNE_PRIME) & MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature
+
+
+def worker_signatures(texts, num_perm, seed, width):
+    """
+    worker at top level otherwise run into pickling issues
+    """
+    signatures = np.full((len(texts), num_perm), MAX_HASH, dtype=np.uint64)
+    for i, text in enumerate(texts):
+        signatures[i] = minhash_signature(text, num_perm, seed, width)
+    return signatures
+
+
+def minhash_signatures(texts, num_perm=128, seed=1, width=SHINGLE_WIDTH, workers=None, chunk_size=256):
+    """
+    Signatures for many texts, optionally split across a process pool.
+
+    Args:
+        texts (list of str): Texts to sign, e.g. each section's normalized_output.
+        num_perm (int): Number of permutations.
+        seed (int): Permutation seed; queries must use the same one.
+        width (int): Shingle width in characters.
+        workers (int, optional): If set, sign chunks of texts in a process pool.
+        chunk_size (int): Texts per pool task.
+
+    Returns:
+        np.ndarray: uint64 matrix of shape (len(texts), num_perm)
+    """
+    if not workers:
+        return worker_signatures(texts, num_perm, seed, width)
+
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker_signatures, chunk, num_perm, seed, width)
+                   for chunk in chunks]
+        blocks = [future.result() for future in futures]
+    return np.concatenate(blocks) if blocks else worker_signatures([], num_perm, seed, width)
+
+
+def save_signatures(path, signatures):
+    """
+    Save a signature matrix as a .npy file.
+    """
+    np.save(path, np.ascontiguousarray(signatures, dtype=np.uint64))
+
+
+def load_signatures(path, mmap=True):
+    """
+    Load a signature matrix saved by `save_signatures`, memory-mapped by default.
+    """
+    return np.load(path, mmap_mode='r' if mmap else None)
@@ -0,0 +1,103 @@
+"""
+int8 storage and search for normalized embedding vectors.
+
+Each vector is stored as int8 codes plus one float32 scale (its largest
+absolute component / 127), a quarter of the float32 footprint. Dot products
+are computed over the codes block by block and rescaled, and the best
+candidates can optionally be re-ranked exactly against float vectors (e.g. a
+float32 matrix memory-mapped from disk).
+"""
+
+import os
+
+import numpy as np
+
+from src.processing.embedding_index import BLOCK_SIZE
+from src.processing.top_k import top_k_rows
+
+
+class Int8Embeddings:
+    """
+    int8-quantized embedding matrix with per-vector scales. Row i holds the
+    vector with id i.
+    """
+
+    def __init__(self, codes, scales):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, vectors):
+        """
+        Quantize a (N x dim) float matrix, scaling each row to the int8 range.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def dequantize(self, ids):
+        """
+        Approximate float32 vectors for the given ids.
+        """
+        return self.codes[ids].astype(np.float32) * self.scales[ids, None]
+
+    def search(self, queries, k=100, rerank_vectors=None, rerank_factor=4):
+        """
+        Approximate top-k dot-product search over the int8 codes.
+
+        Args:
+            queries: (Q x dim) float query vectors, or one vector.
+            k: Results per query.
+            rerank_vectors: Optional float vectors (same ids) to re-score the
+                best `rerank_factor` x k approximate candidates exactly.
+            rerank_factor: Candidate pool size for re-ranking, as a multiple of k.
+
+        Returns:
+            tuple: (ids, scores), both of shape (len(queries), k)
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        pool = k * rerank_factor if rerank_vectors is not None else k
+
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_SIZE):
+            block = self.codes[start:start + BLOCK_SIZE].astype(np.float32) @ queries.T
+            block *= self.scales[start:start + BLOCK_SIZE, None]
+            ids = np.hstack([best_ids, np.broadcast_to(
+                np.arange(start, start + block.shape[0]), (len(queries), block.shape[0]))])
+            top, best_scores = top_k_rows(np.hstack([best_scores, block.T]), pool)
+            best_ids = np.take_along_axis(ids, top, axis=1)
+
+        if rerank_vectors is None:
+            return best_ids, best_scores
+
+        exact = np.einsum('qkd,qd->qk', np.asarray(rerank_vectors[best_ids.ravel()], dtype=np.float32)
+                          .reshape(*best_ids.shape, -1), queries)
+        top, scores = top_k_rows(exact, k)
+        return np.take_along_axis(best_ids, top, axis=1), scores
+
+    def save(self, path):
+        """
+        Write codes and scales as .npy files in a directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "codes.npy"), self.codes)
+        np.save(os.path.join(path, "scales.npy"), self.scales)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open codes and scales written by `save`, memory-mapped by default.
+        """
+        mode = 'r' if mmap else None
+        return cls(np.load(os.path.join(path, "codes.npy"), mmap_mode=mode),
+                   np.load(os.path.join(path, "scales.npy"), mmap_mode=mode))
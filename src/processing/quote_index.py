@@ -0,0 +1,199 @@
+"""
+Fuzzy quote index over token shingles of QUOTE and QUOTED_BLOCK text.
+
+Every quote is lowercased, split into word tokens and cut into overlapping
+`width`-token shingles, hashed to stable 64-bit keys. A section is a candidate
+for a query quote when they share at least as many distinct shingles as a run
+of `min_overlap` contiguous tokens would hold (`min_overlap - width + 1`), so a
+quote that differs by a word, or is a sub-span of a longer quote or quoted
+block, still finds its match. Only the count is checked, not that the shared
+shingles are adjacent. Quotes shorter than `width` tokens are one shingle and
+only match exactly.
+
+Postings are one sorted key array plus a member array, looked up with
+`np.searchsorted`. Additions and removals are buffered and merged on the next
+query.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from src.processing.minhash_signatures import FNV_PRIME
+
+# Tag types whose enclosed text is indexed
+QUOTE_TAGS = ("QUOTE", "QUOTED_BLOCK")
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1 << 20)
+def token_hash(token):
+    """
+    Stable 64-bit hash of a token, the same in every process.
+    """
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def quote_tokens(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def quote_shingles(tokens, width=3):
+    """
+    Distinct keys of every `width`-token shingle, or of the whole quote if it's
+    shorter than that.
+    """
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.fromiter((token_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+    width = min(width, len(tokens))
+    count = len(tokens) - width + 1
+    # Seed with the width, so a short whole-quote key never equals a full shingle
+    keys = np.full(count, width, dtype=np.uint64)
+    for offset in range(width):
+        keys = (keys ^ hashes[offset:offset + count]) * FNV_PRIME
+    return np.unique(keys ^ (keys >> np.uint64(29)))
+
+
+class QuoteIndex:
+    """
+    Shingle key -> section index postings for all quoted text, with overlap
+    thresholded queries.
+    """
+
+    def __init__(self, width=3, min_overlap=5, max_postings=None):
+        self.width = width
+        self.min_overlap = min_overlap
+        self.max_postings = max_postings
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.members = np.zeros(0, dtype=np.int32)
+        self.pending = []
+        self.removed = set()
+
+    @classmethod
+    def build(cls, sections, **kwargs):
+        index = cls(**kwargs)
+        index.add(sections, range(len(sections)))
+        index.compact()
+        return index
+
+    def section_keys(self, section):
+        """
+        Distinct shingle keys over all quotes of a section.
+        """
+        keys = [quote_shingles(quote_tokens(tag['enclosed_text']), self.width)
+                for tag in section.get('tags', []) if tag['type'] in QUOTE_TAGS]
+        return np.unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.uint64)
+
+    def add(self, sections, indices):
+        for i, section in zip(indices, sections):
+            keys = self.section_keys(section)
+            if len(keys):
+                self.pending.append((keys, np.full(len(keys), i, dtype=np.int32)))
+            self.removed.discard(int(i))
+
+    def remove(self, sections, indices):
+        self.removed.update(int(i) for i in indices)
+
+    def compact(self):
+        """
+        Merge buffered additions and drop removed sections from the postings.
+        """
+        if not self.pending and not self.removed:
+            return
+        keys = np.concatenate([self.keys] + [keys for keys, _ in self.pending])
+        members = np.concatenate([self.members] + [members for _, members in self.pending])
+        if self.removed:
+            kept = ~np.isin(members, np.fromiter(self.removed, dtype=np.int32))
+            keys, members = keys[kept], members[kept]
+        order = np.lexsort((members, keys))
+        self.keys, self.members = keys[order], members[order]
+        self.pending, self.removed = [], set()
+
+    def lookup(self, keys):
+        """
+        Concatenated postings of the given keys, skipping keys with more than
+        `max_postings` sections.
+
+        Returns:
+            tuple: (section indices, number of them per key)
+        """
+        lo = np.searchsorted(self.keys, keys, side='left')
+        lengths = np.searchsorted(self.keys, keys, side='right') - lo
+        if self.max_postings is not None:
+            lengths[lengths > self.max_postings] = 0
+        ends = np.cumsum(lengths)
+        positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(lo - ends + lengths, lengths)
+        return self.members[positions], lengths
+
+    def query_quotes(self, section, min_overlap):
+        """
+        Shingle keys of each of a section's quotes, with the number of distinct
+        shared keys a match needs: min(min_overlap, n) - min(width, n) + 1 for
+        a quote of n tokens, at least 1.
+        """
+        for tag in section.get('tags', []):
+            if tag['type'] not in QUOTE_TAGS:
+                continue
+            tokens = quote_tokens(tag['enclosed_text'])
+            keys = quote_shingles(tokens, self.width)
+            if len(keys):
+                yield keys, max(1, min(min_overlap, len(tokens)) - min(self.width, len(tokens)) + 1)
+
+    def query(self, section, min_overlap=None):
+        """
+        Sections sharing enough distinct shingle keys with one of this
+        section's quotes: as many as `min_overlap` contiguous tokens (or the
+        whole quote, if shorter) would hold. The shared shingles are counted,
+        not checked to be contiguous.
+
+        Returns:
+            np.ndarray of section indices, sorted
+        """
+        self.compact()
+        min_overlap = min_overlap or self.min_overlap
+        found = []
+        for keys, required in self.query_quotes(section, min_overlap):
+            sections, shared = np.unique(self.lookup(keys)[0], return_counts=True)
+            found.append(sections[shared >= required])
+
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+    def query_many(self, sections, min_overlap=None):
+        """
+        `query` for a batch of sections: the keys of every quote in the batch
+        are looked up in one pass, and shared keys are counted per
+        (quote, section) pair together.
+
+        Returns:
+            list of np.ndarray of section indices, sorted, one per query
+        """
+        self.compact()
+        min_overlap = min_overlap or self.min_overlap
+        keys, quote_ids, required, owners = [], [], [], []
+        for query, section in enumerate(sections):
+            for quote_keys, quote_required in self.query_quotes(section, min_overlap):
+                keys.append(quote_keys)
+                quote_ids.append(np.full(len(quote_keys), len(required)))
+                required.append(quote_required)
+                owners.append(query)
+
+        empty = np.zeros(0, dtype=np.int64)
+        if not keys or not len(self.members):
+            return [empty] * len(sections)
+
+        members, lengths = self.lookup(np.concatenate(keys))
+        member_quotes = np.repeat(np.concatenate(quote_ids), lengths)
+        slots = int(self.members.max()) + 1
+        pairs, shared = np.unique(member_quotes * slots + members, return_counts=True)
+        pair_quotes, pair_sections = pairs // slots, pairs % slots
+        hit = shared >= np.asarray(required)[pair_quotes]
+
+        matches = np.unique(np.asarray(owners)[pair_quotes[hit]] * slots + pair_sections[hit])
+        bounds = np.searchsorted(matches // slots, np.arange(len(sections) + 1))
+        return [(matches[lo:hi] % slots).astype(np.int64) for lo, hi in zip(bounds[:-1], bounds[1:])]
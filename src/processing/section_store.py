@@ -0,0 +1,78 @@
+"""
+Section store: every parsed section gets a stable integer index.
+
+Index helpers in legis_index work in terms of these indices, so candidates can be
+merged as numpy arrays and mapped back to sections without rebuilding an
+id -> section lookup for every query.
+"""
+
+import numpy as np
+
+
+class SectionStore:
+    """
+    Parsed sections addressed by stable integer index, with a section_id lookup
+    built once. Indices are positions in insertion order and are never reused;
+    removed sections keep their slot and are marked dead in `alive`.
+    `token_lengths` holds each section's token count, the alignment cost
+    estimate used when budgeting candidates.
+    """
+
+    def __init__(self, sections=()):
+        self.sections = []
+        self.id_to_index = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.token_lengths = np.zeros(0, dtype=np.int64)
+        self.add(sections)
+
+    def add(self, sections):
+        """
+        Append sections, returning their new indices.
+        """
+        start = len(self.sections)
+        for offset, section in enumerate(sections):
+            self.sections.append(section)
+            self.id_to_index.setdefault(section['section_id'], start + offset)
+        self.alive = np.concatenate(
+            [self.alive, np.ones(len(self.sections) - start, dtype=bool)])
+        self.token_lengths = np.concatenate([self.token_lengths, np.fromiter(
+            (len(section['normalized_output'].split()) for section in self.sections[start:]),
+            dtype=np.int64, count=len(self.sections) - start)])
+        return np.arange(start, len(self.sections), dtype=np.int64)
+
+    def remove(self, indices):
+        """
+        Mark sections as removed. Their indices stay reserved.
+        """
+        for i in indices:
+            self.alive[i] = False
+            section_id = self.sections[i]['section_id']
+            if self.id_to_index.get(section_id) == i:
+                del self.id_to_index[section_id]
+
+    def live_indices(self):
+        """
+        Indices of sections that haven't been removed, in order.
+        """
+        return np.flatnonzero(self.alive)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __getitem__(self, index):
+        return self.sections[index]
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def index_of(self, section_id):
+        """
+        Stable index of the section with this id.
+        """
+        return self.id_to_index[section_id]
+
+    def take(self, indices):
+        """
+        Sections at the given indices, in order.
+        """
+        return [self.sections[i] for i in indices]
@@ -0,0 +1,109 @@
+"""
+Tokenized corpus held once in shared memory, for process-pool workers.
+
+Every token is interned to an int32 id, and all sections are concatenated into
+one id array plus an offsets array. Workers attach to the same shared blocks by
+name, so tasks only need to carry (query_idx, candidate_idx) pairs.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.processing.compare_fn import WILKERSON_WEIGHTS, match_weights
+
+
+class TokenCorpus:
+    """
+    Interned token ids, section offsets and per-id match weights, backed by
+    shared memory. Build once in the parent with `TokenCorpus.build`, pass
+    `corpus.spec` to workers, and `TokenCorpus.attach(spec)` there.
+    """
+
+    def __init__(self, spec, blocks, owner):
+        self.spec = spec
+        self._blocks = blocks
+        self._owner = owner
+        self.ids = np.ndarray((spec["num_tokens"],), dtype=np.int32, buffer=blocks["ids"].buf)
+        self.offsets = np.ndarray((spec["num_sections"] + 1,), dtype=np.int64, buffer=blocks["offsets"].buf)
+        self.token_match = np.ndarray((spec["vocab_size"],), dtype=np.float64, buffer=blocks["token_match"].buf)
+
+    @classmethod
+    def build(cls, token_lists, weights=WILKERSON_WEIGHTS):
+        """
+        Intern and pack token lists into new shared memory blocks.
+
+        Args:
+            token_lists (list of list of str): Tokenized sections.
+            weights (dict): Smith-Waterman scoring parameters, used for the
+                per-id match weights.
+
+        Returns:
+            tuple: (TokenCorpus, vocab), where vocab maps token -> id.
+        """
+        vocab = {}
+        offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        for i, tokens in enumerate(token_lists):
+            offsets[i + 1] = offsets[i] + len(tokens)
+        ids = np.fromiter(
+            (vocab.setdefault(token, len(vocab)) for tokens in token_lists for token in tokens),
+            dtype=np.int32, count=int(offsets[-1]))
+        token_match = match_weights(list(vocab), weights)
+
+        arrays = {"ids": ids, "offsets": offsets, "token_match": token_match}
+        blocks = {}
+        for name, array in arrays.items():
+            # Zero-size shared memory isn't allowed
+            blocks[name] = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=blocks[name].buf)[:] = array
+
+        spec = {
+            "names": {name: block.name for name, block in blocks.items()},
+            "num_tokens": len(ids),
+            "num_sections": len(token_lists),
+            "vocab_size": len(vocab),
+            "weights": dict(weights),
+        }
+        return cls(spec, blocks, owner=True), vocab
+
+    @classmethod
+    def attach(cls, spec):
+        """
+        Attach to a corpus built in another process.
+        """
+        blocks = {name: shared_memory.SharedMemory(name=block_name)
+                  for name, block_name in spec["names"].items()}
+        return cls(spec, blocks, owner=False)
+
+    def __len__(self):
+        return self.spec["num_sections"]
+
+    def length(self, i):
+        """
+        Number of tokens in section i.
+        """
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    def section(self, i):
+        """
+        Token ids of section i, as a view into shared memory.
+        """
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def close(self):
+        """
+        Detach from the shared blocks, and free them if this process built them.
+        """
+        # Drop views before closing, otherwise the buffers are still exported
+        self.ids = self.offsets = self.token_match = None
+        for block in self._blocks.values():
+            block.close()
+            if self._owner:
+                block.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,24 @@
+"""
+Top-k selection shared by the TF-IDF, embedding and quantized search paths,
+kept free of their heavier dependencies.
+"""
+
+import numpy as np
+
+
+def top_k_rows(similarities, top_n):
+    """
+    Top-n columns of every row of a dense similarity block, best first, using
+    argpartition instead of a full sort.
+
+    Returns:
+        tuple: (indices, scores), both of shape (rows, min(top_n, columns))
+    """
+    k = min(top_n, similarities.shape[1])
+    if k == 0:
+        empty = np.zeros((similarities.shape[0], 0))
+        return empty.astype(np.int64), empty
+    part = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(similarities, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)